@@ -8,13 +8,16 @@ for automated marketing campaigns.
 __version__ = "1.0.0"
 __author__ = "Chad Littlepage"
 
-from .domain_finder import find_domain
-from .pattern_generator import generate_email_patterns
+from .domain_finder import DomainCache, find_domain, find_domains
+from .pattern_generator import generate_email_patterns, generate_email_patterns_batch
 from .email_verifier import verify_email_smtp, VerificationResult
 
 __all__ = [
+    "DomainCache",
     "find_domain",
+    "find_domains",
     "generate_email_patterns",
+    "generate_email_patterns_batch",
     "verify_email_smtp",
     "VerificationResult",
 ]
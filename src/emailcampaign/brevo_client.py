@@ -2,11 +2,26 @@
 Brevo (Sendinblue) Integration - Sync contacts and manage campaigns
 """
 import os
+import asyncio
 from typing import Optional, List, Dict, Any
 from dataclasses import dataclass
+from functools import partial
+from urllib.parse import quote
+import aiohttp
 import sib_api_v3_sdk
 from sib_api_v3_sdk.rest import ApiException
 
+from .http_retry import request_with_retry
+
+
+BREVO_API_URL = "https://api.brevo.com/v3"
+
+# Maximum page size of the Brevo get-lists endpoint
+LISTS_PAGE_SIZE = 50
+
+# Below this many contacts, per-contact creates are cheaper than an import job
+BULK_IMPORT_THRESHOLD = 50
+
 
 @dataclass
 class Contact:
@@ -19,6 +34,69 @@ class Contact:
     attributes: Optional[Dict[str, Any]] = None
 
 
+def _contact_attributes(contact: Contact) -> Dict[str, Any]:
+    """Build the Brevo attribute dict for a contact"""
+    attributes: Dict[str, Any] = {
+        "FIRSTNAME": contact.first_name,
+        "LASTNAME": contact.last_name,
+    }
+    if contact.company:
+        attributes["COMPANY"] = contact.company
+    if contact.position:
+        attributes["POSITION"] = contact.position
+    if contact.linkedin_url:
+        attributes["LINKEDIN_URL"] = contact.linkedin_url
+    if contact.attributes:
+        attributes.update(contact.attributes)
+    return attributes
+
+
+def _create_contact_body(contact: Contact, list_ids: List[int]) -> Dict[str, Any]:
+    """Build the JSON body for Brevo's create-contact endpoint"""
+    return {
+        "email": contact.email,
+        "attributes": _contact_attributes(contact),
+        "listIds": list_ids,
+        "updateEnabled": True,  # Update if exists
+    }
+
+
+# Brevo attribute names, in ContactBatch column order
+_BATCH_ATTRIBUTES = ("FIRSTNAME", "LASTNAME", "COMPANY", "POSITION", "LINKEDIN_URL")
+
+
+@dataclass
+class ContactBatch:
+    """Contacts stored column-wise, for bulk syncs without a Contact per row"""
+
+    emails: List[str]
+    first_names: List[str]
+    last_names: List[str]
+    companies: List[str]
+    positions: List[str]
+    linkedin_urls: List[str]
+
+    def __len__(self) -> int:
+        return len(self.emails)
+
+    def to_brevo_rows(self) -> List[Dict[str, Any]]:
+        """Build import rows in Brevo's JSON format (empty attributes are left out)"""
+        columns = zip(self.first_names, self.last_names, self.companies, self.positions, self.linkedin_urls)
+        return [
+            {"email": email, "attributes": {name: value for name, value in zip(_BATCH_ATTRIBUTES, values) if value}}
+            for email, values in zip(self.emails, columns)
+        ]
+
+    def to_contacts(self) -> List[Contact]:
+        """Expand into Contact objects"""
+        return [
+            Contact(*fields)
+            for fields in zip(
+                self.emails, self.first_names, self.last_names, self.companies, self.positions, self.linkedin_urls
+            )
+        ]
+
+
 @dataclass
 class SyncResult:
     total: int
@@ -27,6 +105,14 @@ class SyncResult:
     failed: int
     errors: List[str]
 
+    def merge(self, other: "SyncResult") -> None:
+        """Add another result's counts and errors to this one"""
+        self.total += other.total
+        self.created += other.created
+        self.updated += other.updated
+        self.failed += other.failed
+        self.errors.extend(other.errors)
+
 
 class BrevoClient:
     """Client for Brevo (Sendinblue) API operations"""
@@ -38,18 +124,22 @@ class BrevoClient:
         Args:
             api_key: Brevo API key. If not provided, reads from BREVO_API_KEY env var.
         """
-        self.api_key = api_key or os.getenv("BREVO_API_KEY")
-        if not self.api_key:
+        api_key = api_key or os.getenv("BREVO_API_KEY")
+        if not api_key:
             raise ValueError(
                 "Brevo API key required. Set BREVO_API_KEY environment variable "
                 "or pass api_key parameter."
             )
+        self.api_key: str = api_key
 
         # Configure API client
         configuration = sib_api_v3_sdk.Configuration()
         configuration.api_key["api-key"] = self.api_key
         self.api_client = sib_api_v3_sdk.ApiClient(configuration)
 
+        # List name -> ID, resolved once per client
+        self._list_id_cache: Dict[str, int] = {}
+
         # Initialize API instances
         self.contacts_api = sib_api_v3_sdk.ContactsApi(self.api_client)
         self.lists_api = sib_api_v3_sdk.ContactsApi(self.api_client)
@@ -66,17 +156,28 @@ class BrevoClient:
         Returns:
             List ID
         """
+        if list_name in self._list_id_cache:
+            return self._list_id_cache[list_name]
+
         try:
-            # Get all lists and find by name
-            lists = self.contacts_api.get_lists(limit=50)
-            for lst in lists.lists:
-                if lst.name == list_name:
-                    return lst.id
+            # Page through all lists and find by name
+            offset = 0
+            while True:
+                page = self.contacts_api.get_lists(limit=LISTS_PAGE_SIZE, offset=offset)
+                lists = page.lists or []
+                for lst in lists:
+                    if lst["name"] == list_name:
+                        self._list_id_cache[list_name] = lst["id"]
+                        return lst["id"]
+                if len(lists) < LISTS_PAGE_SIZE:
+                    break
+                offset += LISTS_PAGE_SIZE
 
             # Create new list if not found
             create_list = sib_api_v3_sdk.CreateList(name=list_name, folder_id=folder_id)
             result = self.contacts_api.create_list(create_list)
-            return result.id
+            list_id = self._list_id_cache[list_name] = int(result.id)
+            return list_id
 
         except ApiException as e:
             raise Exception(f"Failed to get/create list: {e}")
@@ -93,22 +194,9 @@ class BrevoClient:
             True if successful
         """
         try:
-            attributes = {
-                "FIRSTNAME": contact.first_name,
-                "LASTNAME": contact.last_name,
-            }
-            if contact.company:
-                attributes["COMPANY"] = contact.company
-            if contact.position:
-                attributes["POSITION"] = contact.position
-            if contact.linkedin_url:
-                attributes["LINKEDIN_URL"] = contact.linkedin_url
-            if contact.attributes:
-                attributes.update(contact.attributes)
-
             create_contact = sib_api_v3_sdk.CreateContact(
                 email=contact.email,
-                attributes=attributes,
+                attributes=_contact_attributes(contact),
                 list_ids=list_ids or [],
                 update_enabled=True,  # Update if exists
             )
@@ -125,19 +213,8 @@ class BrevoClient:
     def _update_contact(self, contact: Contact, list_ids: Optional[List[int]] = None) -> bool:
         """Update existing contact"""
         try:
-            attributes = {
-                "FIRSTNAME": contact.first_name,
-                "LASTNAME": contact.last_name,
-            }
-            if contact.company:
-                attributes["COMPANY"] = contact.company
-            if contact.position:
-                attributes["POSITION"] = contact.position
-            if contact.linkedin_url:
-                attributes["LINKEDIN_URL"] = contact.linkedin_url
-
             update_contact = sib_api_v3_sdk.UpdateContact(
-                attributes=attributes,
+                attributes=_contact_attributes(contact),
                 list_ids=list_ids or [],
             )
 
@@ -147,19 +224,46 @@ class BrevoClient:
         except ApiException:
             return False
 
+    def import_rows(self, rows: List[Dict[str, Any]], list_ids: List[int]) -> int:
+        """
+        Create or update many contacts with a single import request.
+
+        Brevo processes the import server-side, so one HTTP call replaces
+        one create_contact call per contact.
+
+        Args:
+            rows: Rows like {"email": ..., "attributes": {...}}
+            list_ids: List IDs to add contacts to
+
+        Returns:
+            Brevo process ID of the import job
+        """
+        request = sib_api_v3_sdk.RequestContactImport(
+            json_body=rows,
+            list_ids=list_ids,
+            update_existing_contacts=True,
+            email_blacklist=False,
+        )
+        result = self.contacts_api.import_contacts(request)
+        return int(result.process_id)
+
     def sync_contacts(
         self,
         contacts: List[Contact],
         list_name: str = "LinkedIn Connections",
-        batch_size: int = 100,
+        batch_size: int = 1000,
     ) -> SyncResult:
         """
         Sync multiple contacts to Brevo.
 
+        Large syncs go through the bulk import endpoint in chunks of
+        batch_size; small ones (under BULK_IMPORT_THRESHOLD) are created
+        one by one.
+
         Args:
             contacts: List of contacts to sync
             list_name: Name of list to add contacts to
-            batch_size: Number of contacts per batch (for progress tracking)
+            batch_size: Number of contacts per import request
 
         Returns:
             SyncResult with statistics
@@ -167,25 +271,125 @@ class BrevoClient:
         # Get or create the list
         list_id = self.get_or_create_list(list_name)
 
+        if len(contacts) < BULK_IMPORT_THRESHOLD:
+            # Not callable from inside a running event loop; await
+            # async_sync_contacts directly there instead.
+            return asyncio.run(self.async_sync_contacts(contacts, list_id))
+
+        rows = [{"email": c.email, "attributes": _contact_attributes(c)} for c in contacts]
+        return self._import_in_chunks(rows, list_id, batch_size)
+
+    def sync_contact_batch(
+        self,
+        batch: ContactBatch,
+        list_name: str = "LinkedIn Connections",
+        batch_size: int = 1000,
+    ) -> SyncResult:
+        """
+        Sync a column-wise contact batch to Brevo.
+
+        Same behaviour as sync_contacts, but import rows are built straight
+        from the batch columns.
+
+        Args:
+            batch: Contacts to sync
+            list_name: Name of list to add contacts to
+            batch_size: Number of contacts per import request
+
+        Returns:
+            SyncResult with statistics
+        """
+        if len(batch) < BULK_IMPORT_THRESHOLD:
+            return self.sync_contacts(batch.to_contacts(), list_name=list_name)
+
+        list_id = self.get_or_create_list(list_name)
+        return self._import_in_chunks(batch.to_brevo_rows(), list_id, batch_size)
+
+    def _import_in_chunks(self, rows: List[Dict[str, Any]], list_id: int, batch_size: int) -> SyncResult:
+        """Import rows with one request per batch_size chunk"""
         result = SyncResult(
-            total=len(contacts),
+            total=len(rows),
             created=0,
             updated=0,
             failed=0,
             errors=[],
         )
 
-        for i, contact in enumerate(contacts):
+        for start in range(0, len(rows), batch_size):
+            chunk = rows[start:start + batch_size]
             try:
-                success = self.create_contact(contact, list_ids=[list_id])
-                if success:
-                    result.created += 1
+                self.import_rows(chunk, list_ids=[list_id])
+                result.created += len(chunk)
             except ApiException as e:
+                result.failed += len(chunk)
+                result.errors.append(f"Import of contacts {start + 1}-{start + len(chunk)}: {e.reason}")
+
+        return result
+
+    async def async_sync_contacts(
+        self,
+        contacts: List[Contact],
+        list_id: int,
+        concurrency: int = 10,
+    ) -> SyncResult:
+        """
+        Create or update contacts one by one, with concurrent requests.
+
+        Talks to the Brevo REST API directly over aiohttp since the SDK
+        client is blocking.
+
+        Args:
+            contacts: Contacts to sync
+            list_id: List ID to add contacts to
+            concurrency: Maximum number of requests in flight
+
+        Returns:
+            SyncResult with statistics
+        """
+        result = SyncResult(
+            total=len(contacts),
+            created=0,
+            updated=0,
+            failed=0,
+            errors=[],
+        )
+        semaphore = asyncio.Semaphore(concurrency)
+        headers = {"api-key": self.api_key, "accept": "application/json"}
+
+        async with aiohttp.ClientSession(headers=headers) as session:
+
+            async def sync_one(contact: Contact) -> str:
+                body = _create_contact_body(contact, [list_id])
+                async with semaphore:
+                    send = partial(session.post, f"{BREVO_API_URL}/contacts", json=body)
+                    async with await request_with_retry(send) as response:
+                        if response.status == 201:
+                            return "created"
+                        if response.status == 204:
+                            return "updated"
+                        text = await response.text()
+                        if response.status != 400 or "already exist" not in text.lower():
+                            raise Exception(f"{response.status} {response.reason}: {text}")
+
+                    # Contact exists, try to update
+                    url = f"{BREVO_API_URL}/contacts/{quote(contact.email)}"
+                    body = {"attributes": body["attributes"], "listIds": [list_id]}
+                    send = partial(session.put, url, json=body)
+                    async with await request_with_retry(send) as response:
+                        if response.status >= 300:
+                            raise Exception(f"{response.status} {response.reason}: {await response.text()}")
+                        return "updated"
+
+            outcomes = await asyncio.gather(*[sync_one(c) for c in contacts], return_exceptions=True)
+
+        for contact, outcome in zip(contacts, outcomes):
+            if outcome == "created":
+                result.created += 1
+            elif outcome == "updated":
+                result.updated += 1
+            else:
                 result.failed += 1
-                result.errors.append(f"{contact.email}: {e.reason}")
-            except Exception as e:
-                result.failed += 1
-                result.errors.append(f"{contact.email}: {str(e)}")
+                result.errors.append(f"{contact.email}: {outcome}")
 
         return result
 
@@ -255,48 +459,73 @@ class BrevoClient:
             raise Exception(f"Failed to get account info: {e}")
 
 
+# CSV column -> ContactBatch field
+CSV_CONTACT_COLUMNS = {
+    "Found Email": "emails",
+    "First Name": "first_names",
+    "Last Name": "last_names",
+    "Company": "companies",
+    "Position": "positions",
+    "URL": "linkedin_urls",
+}
+
+
 # Convenience function
 def sync_linkedin_to_brevo(
     csv_path: str,
     api_key: Optional[str] = None,
     list_name: str = "LinkedIn Connections",
+    chunksize: int = 5000,
 ) -> SyncResult:
     """
     Sync LinkedIn connections CSV (with found emails) to Brevo.
 
+    The CSV is streamed in chunks of chunksize rows, reading only the
+    columns needed, so memory stays flat for large exports. Raises
+    ValueError if the CSV has no 'Found Email' column.
+
     Args:
         csv_path: Path to CSV file with 'Found Email' column
         api_key: Brevo API key (or set BREVO_API_KEY env var)
         list_name: Name of Brevo list to create/update
+        chunksize: Number of CSV rows read and synced at a time
 
     Returns:
         SyncResult with statistics
     """
     import pandas as pd
 
-    # Read CSV
-    df = pd.read_csv(csv_path)
-
-    # Filter to contacts with emails
-    df_with_emails = df[df["Found Email"].notna() & (df["Found Email"] != "")]
-
-    # Convert to Contact objects
-    contacts = []
-    for _, row in df_with_emails.iterrows():
-        contacts.append(
-            Contact(
-                email=row["Found Email"],
-                first_name=str(row.get("First Name", "")).strip(),
-                last_name=str(row.get("Last Name", "")).strip(),
-                company=str(row.get("Company", "")).strip() if pd.notna(row.get("Company")) else None,
-                position=str(row.get("Position", "")).strip() if pd.notna(row.get("Position")) else None,
-                linkedin_url=str(row.get("URL", "")).strip() if pd.notna(row.get("URL")) else None,
-            )
-        )
+    if "Found Email" not in pd.read_csv(csv_path, nrows=0).columns:
+        raise ValueError("Missing required column: Found Email")
 
-    # Sync to Brevo
     client = BrevoClient(api_key=api_key)
-    return client.sync_contacts(contacts, list_name=list_name)
+    result = SyncResult(total=0, created=0, updated=0, failed=0, errors=[])
+
+    # Read only the contact columns, as plain strings (empty cells stay "")
+    chunks = pd.read_csv(
+        csv_path,
+        usecols=lambda column: column in CSV_CONTACT_COLUMNS,
+        dtype=str,
+        keep_default_na=False,
+        chunksize=chunksize,
+    )
+    for chunk in chunks:
+        # Strip whitespace; columns missing from the file become empty strings
+        fields = (
+            chunk.reindex(columns=list(CSV_CONTACT_COLUMNS))
+            .fillna("")
+            .apply(lambda column: column.str.strip())
+        )
+
+        # Filter to contacts with emails
+        fields = fields[fields["Found Email"] != ""]
+        if fields.empty:
+            continue
+
+        batch = ContactBatch(**{field: fields[column].tolist() for column, field in CSV_CONTACT_COLUMNS.items()})
+        result.merge(client.sync_contact_batch(batch, list_name=list_name))
+
+    return result
 
 
 # Test
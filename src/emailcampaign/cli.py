@@ -4,9 +4,158 @@ EmailCampaign CLI - Find emails and sync to Brevo
 """
 import argparse
 import asyncio
+import atexit
 import os
 import sys
 from pathlib import Path
+from typing import List, Optional
+
+
+def _use_uvloop() -> None:
+    """Run asyncio on uvloop when it is installed (pip install "emailcampaign[fast]")"""
+    try:
+        import uvloop
+    except ImportError:
+        return
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+
+def _load_domain_cache():
+    """Load the on-disk domain cache and save it again when the process exits"""
+    from .domain_finder import DomainCache
+
+    cache = DomainCache()
+    cache.load()
+    atexit.register(cache.save)
+    return cache
+
+
+class SyncError(Exception):
+    """Brevo rejected or failed an upload while the pipeline was running"""
+
+
+async def _run_pipeline(finder, client, input_path: str, output_path: str, list_name: str, batch_size: int = 100):
+    """
+    Find emails and sync them to Brevo concurrently.
+
+    Contacts are queued as soon as their email is found and uploaded in
+    batches while the remaining lookups are still running. If Brevo fails,
+    email finding still runs to completion (the output CSV has every
+    result) and the error is raised at the end as a SyncError. Errors from
+    email finding itself propagate unchanged.
+    """
+    from .brevo_client import SyncResult
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=500)
+    result = SyncResult(total=0, created=0, updated=0, failed=0, errors=[])
+    failures: List[Exception] = []
+
+    async def sync(batch):
+        if failures:
+            return
+        try:
+            result.merge(await asyncio.to_thread(client.sync_contacts, batch, list_name))
+        except Exception as e:
+            failures.append(e)
+
+    await asyncio.gather(
+        _produce_contacts(finder, queue, input_path, output_path),
+        _consume_contacts(queue, batch_size, sync),
+    )
+    if failures:
+        raise SyncError(str(failures[0])) from failures[0]
+    return result
+
+
+async def _produce_contacts(finder, queue: asyncio.Queue, input_path: str, output_path: str) -> None:
+    """Queue a Contact for every row with a found email, then None to mark the end"""
+    from .brevo_client import Contact
+
+    try:
+        async for row, found in finder.iter_csv(input_path, output_path):
+            if found.found_email:
+                await queue.put(
+                    Contact(
+                        email=found.found_email,
+                        first_name=found.first_name,
+                        last_name=found.last_name,
+                        company=found.company or None,
+                        position=_text(row.get("Position")),
+                        linkedin_url=_text(row.get("URL")),
+                    )
+                )
+    finally:
+        await queue.put(None)
+
+
+async def _consume_contacts(queue: asyncio.Queue, batch_size: int, sync) -> None:
+    """Pass queued contacts to sync() in batches of batch_size until the end marker"""
+    batch = []
+    while (contact := await queue.get()) is not None:
+        batch.append(contact)
+        if len(batch) >= batch_size:
+            await sync(batch)
+            batch = []
+    if batch:
+        await sync(batch)
+
+
+def _text(value) -> Optional[str]:
+    """Stripped string for a CSV cell, or None if it is blank or missing"""
+    if isinstance(value, str) and value.strip():
+        return value.strip()
+    return None
+
+
+def _pipeline_command(args) -> None:
+    """Run the pipeline subcommand: find emails and sync them to Brevo"""
+    from .email_finder import LinkedInEmailFinder
+    from .brevo_client import BrevoClient
+
+    print(
+        """
+╔═══════════════════════════════════════════════════════════════╗
+║           EmailCampaign - Full Pipeline                       ║
+║   Find emails → Sync to Brevo                                 ║
+╚═══════════════════════════════════════════════════════════════╝
+    """
+    )
+
+    # Determine output path
+    input_path = Path(args.input)
+    output_path = args.output or str(
+        input_path.parent / f"{input_path.stem}_with_emails.csv"
+    )
+
+    finder = LinkedInEmailFinder(concurrency=3, verify=True, domain_cache=_load_domain_cache())
+    try:
+        client = BrevoClient()
+    except ValueError as e:
+        # Still find emails; they can be synced later from the output CSV
+        print("\n📧 Finding emails...")
+        try:
+            asyncio.run(finder.process_csv(args.input, output_path))
+        except (OSError, ValueError) as find_error:
+            print(f"❌ Email finding failed: {find_error}")
+            sys.exit(1)
+        print(f"❌ Brevo sync failed: {e}")
+        print("   Set BREVO_API_KEY and try: emailcampaign sync " + output_path)
+        return
+
+    # Find emails and sync them to Brevo as they are found
+    print(f"\n📧 Finding emails and syncing them to Brevo list: {args.list}...")
+    try:
+        result = asyncio.run(_run_pipeline(finder, client, args.input, output_path, args.list))
+    except SyncError as e:
+        finder.print_summary()
+        print(f"❌ Brevo sync failed: {e}")
+        print("   Set BREVO_API_KEY and try: emailcampaign sync " + output_path)
+        return
+    except (OSError, ValueError) as e:
+        print(f"❌ Email finding failed: {e}")
+        sys.exit(1)
+    finder.print_summary()
+    print(f"✅ Synced {result.created + result.updated} contacts to Brevo list: {args.list}")
 
 
 def main():
@@ -43,6 +192,12 @@ Examples:
         default=3,
         help="Number of concurrent lookups (default: 3)",
     )
+    find_parser.add_argument(
+        "--domain-concurrency",
+        type=int,
+        default=20,
+        help="Number of concurrent company domain lookups (default: 20)",
+    )
 
     # Sync to Brevo command
     sync_parser = subparsers.add_parser("sync", help="Sync contacts to Brevo")
@@ -74,6 +229,7 @@ Examples:
     )
 
     args = parser.parse_args()
+    _use_uvloop()
 
     if args.command == "find":
         from .email_finder import LinkedInEmailFinder
@@ -82,6 +238,8 @@ Examples:
             finder = LinkedInEmailFinder(
                 concurrency=args.concurrency,
                 verify=not args.no_verify,
+                domain_cache=_load_domain_cache(),
+                domain_concurrency=args.domain_concurrency,
             )
             await finder.process_csv(args.input, args.output)
 
@@ -118,7 +276,7 @@ Examples:
             print("SYNC COMPLETE")
             print("=" * 50)
             print(f"Total contacts:  {result.total}")
-            print(f"Created/Updated: {result.created}")
+            print(f"Created/Updated: {result.created + result.updated}")
             print(f"Failed:          {result.failed}")
             if result.errors:
                 print(f"\nErrors ({len(result.errors)}):")
@@ -133,44 +291,7 @@ Examples:
             sys.exit(1)
 
     elif args.command == "pipeline":
-        from .email_finder import LinkedInEmailFinder
-        from .brevo_client import sync_linkedin_to_brevo
-
-        print(
-            """
-╔═══════════════════════════════════════════════════════════════╗
-║           EmailCampaign - Full Pipeline                       ║
-║   Find emails → Sync to Brevo                                 ║
-╚═══════════════════════════════════════════════════════════════╝
-        """
-        )
-
-        # Determine output path
-        input_path = Path(args.input)
-        output_path = args.output or str(
-            input_path.parent / f"{input_path.stem}_with_emails.csv"
-        )
-
-        # Step 1: Find emails
-        print("\n📧 Step 1: Finding emails...")
-
-        async def run_find():
-            finder = LinkedInEmailFinder(concurrency=3, verify=True)
-            await finder.process_csv(args.input, output_path)
-
-        asyncio.run(run_find())
-
-        # Step 2: Sync to Brevo
-        print("\n📤 Step 2: Syncing to Brevo...")
-        try:
-            result = sync_linkedin_to_brevo(
-                csv_path=output_path,
-                list_name=args.list,
-            )
-            print(f"✅ Synced {result.created} contacts to Brevo list: {args.list}")
-        except Exception as e:
-            print(f"❌ Brevo sync failed: {e}")
-            print("   Set BREVO_API_KEY and try: emailcampaign sync " + output_path)
+        _pipeline_command(args)
 
     else:
         parser.print_help()
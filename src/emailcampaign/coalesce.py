@@ -0,0 +1,45 @@
+"""
+Coalesce - Share one running lookup between concurrent callers asking for the same key
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+async def coalesced(inflight: Dict[str, "asyncio.Future[T]"], key: str, compute: Callable[[], Awaitable[T]]) -> T:
+    """
+    Run compute() for key, or wait for the identical call that is already running.
+
+    If the call being waited on is cancelled, its waiters start over (joining
+    the next call or running compute() themselves) instead of inheriting the
+    cancellation. Errors from compute() reach every waiter.
+
+    Args:
+        inflight: Key -> future of the call running for it, owned by the caller's module
+        key: What is being computed, e.g. a domain name
+        compute: Zero-argument coroutine function doing the actual work
+
+    Returns:
+        The result of compute()
+    """
+    while (pending := inflight.get(key)) is not None:
+        # Raises only if this task is cancelled; the call waited on keeps running
+        await asyncio.wait({pending})
+        if not pending.cancelled():
+            return pending.result()
+
+    future = asyncio.get_running_loop().create_future()
+    inflight[key] = future
+    try:
+        result = await compute()
+        future.set_result(result)
+        return result
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # Waiters still see it; no "never retrieved" warning if there are none
+        raise
+    finally:
+        if not future.done():
+            future.cancel()
+        del inflight[key]
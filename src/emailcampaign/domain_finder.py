@@ -1,13 +1,50 @@
 """
 Domain Finder - Finds company domains from company names
 """
+import os
 import re
+import time
 import asyncio
+import tempfile
 import aiohttp
-from urllib.parse import urlparse, quote_plus
-from typing import Optional, Dict
+import dns.asyncresolver
+import dns.exception
+from collections.abc import MutableMapping
+from contextlib import aclosing
+from functools import partial
+from pathlib import Path
+from urllib.parse import quote_plus
+from typing import AsyncGenerator, AsyncIterator, Iterator, Optional, Dict, List, Tuple, Union
 import json
 
+from .coalesce import coalesced
+from .http_retry import request_with_retry
+
+
+DEFAULT_DOMAIN_CACHE_PATH = Path.home() / ".cache" / "emailcampaign" / "domains.json"
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
+
+# Shared HTTP session, so lookups reuse warm connections and cached DNS
+_session: Optional[aiohttp.ClientSession] = None
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Default limits for requests on the shared session; a slow connect fails fast
+SESSION_TIMEOUT = aiohttp.ClientTimeout(total=15, connect=5)
+
+# Shared resolver with bounded per-query time (see _get_resolver)
+_resolver: Optional[dns.asyncresolver.Resolver] = None
+
+# Domain -> (resolves, checked_at). Failed lookups are retried after NEGATIVE_CACHE_TTL seconds.
+_domain_exists_cache: Dict[str, Tuple[bool, float]] = {}
+NEGATIVE_CACHE_TTL = 3600
+
+# Normalized company name -> lookup currently running for it
+_inflight: Dict[str, asyncio.Future] = {}
+
+# Domain -> DNS check currently running for it
+_exists_inflight: Dict[str, asyncio.Future] = {}
+
 
 # Common company domain mappings (for speed)
 KNOWN_DOMAINS: Dict[str, str] = {
@@ -43,20 +80,140 @@ KNOWN_DOMAINS: Dict[str, str] = {
 }
 
 
+class DomainCache(MutableMapping):
+    """
+    Company -> domain cache persisted as JSON between runs.
+
+    Can be passed anywhere find_domain accepts a cache dict. Entries older
+    than ttl seconds (negative_ttl for companies with no domain) count as
+    missing, so stale results are looked up again.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path] = DEFAULT_DOMAIN_CACHE_PATH,
+        ttl: float = 90 * 86400,
+        negative_ttl: float = 7 * 86400,
+    ):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: Dict[str, Tuple[Optional[str], float]] = {}
+
+    def load(self) -> None:
+        """Load entries from disk (a missing or unreadable file means an empty cache)"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            entries = {key: (value["domain"], float(value["checked_at"])) for key, value in data.items()}
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            return
+        self._entries = {key: entry for key, entry in entries.items() if self._is_fresh(entry)}
+
+    def save(self) -> None:
+        """Write entries to disk atomically"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            key: {"domain": domain, "checked_at": checked_at}
+            for key, (domain, checked_at) in self._entries.items()
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=".domains-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _is_fresh(self, entry: Tuple[Optional[str], float]) -> bool:
+        domain, checked_at = entry
+        ttl = self.ttl if domain else self.negative_ttl
+        return time.time() - checked_at < ttl
+
+    def __getitem__(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None or not self._is_fresh(entry):
+            raise KeyError(key)
+        return entry[0]
+
+    def __setitem__(self, key: str, domain: Optional[str]) -> None:
+        self._entries[key] = (domain, time.time())
+
+    def __delitem__(self, key: str) -> None:
+        del self._entries[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter([key for key, entry in self._entries.items() if self._is_fresh(entry)])
+
+    def __len__(self) -> int:
+        return sum(1 for entry in self._entries.values() if self._is_fresh(entry))
+
+
+async def get_session() -> aiohttp.ClientSession:
+    """Get the shared HTTP session, creating it on first use in this event loop"""
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        connector = aiohttp.TCPConnector(
+            limit=50,
+            limit_per_host=10,
+            ttl_dns_cache=3600,
+            use_dns_cache=True,
+            keepalive_timeout=60,
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=SESSION_TIMEOUT,
+            headers={"User-Agent": USER_AGENT},
+        )
+        _session_loop = loop
+    return _session
+
+
+async def close_session() -> None:
+    """Close the shared HTTP session (call before the event loop shuts down)"""
+    global _session, _session_loop
+    if _session is not None and not _session.closed and _session_loop is asyncio.get_running_loop():
+        await _session.close()
+    _session = None
+    _session_loop = None
+
+
+# Trailing legal/corporate suffixes (and anything after a comma), stripped in one pass
+_SUFFIX_RE = re.compile(
+    r'(?:\s+(?:inc|llc|ltd|corp|corporation|company|co|group|holdings?|technology|technologies'
+    r'|solutions|services|international|worldwide|global)\.?|,.*)+$'
+)
+
+_WORD_RE = re.compile(r'\w+')
+
+# KNOWN_DOMAINS keyed by their words joined with single spaces, for whole-word lookups
+_KNOWN_BY_WORDS = {' '.join(_WORD_RE.findall(key)): domain for key, domain in KNOWN_DOMAINS.items()}
+_KNOWN_MAX_WORDS = max(len(key.split()) for key in _KNOWN_BY_WORDS)
+
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9]')
+
+# Host part of absolute links in search result HTML
+_HREF_PREFIX = b'href="https://'
+_HREF_HOST_RE = re.compile(rb'href="https?://([^/"?#:]+)')
+
+# Result links appear near the top of the page; don't read past this
+MAX_SEARCH_BYTES = 64 * 1024
+
+# Search engines and common sites that are never a company's own domain
+_SKIP_DOMAINS = frozenset([
+    'duckduckgo', 'google', 'bing', 'yahoo', 'wikipedia',
+    'linkedin.com', 'facebook.com', 'twitter.com', 'youtube.com',
+    'glassdoor', 'indeed', 'crunchbase', 'bloomberg',
+])
+
+
 def normalize_company_name(company: str) -> str:
     """Normalize company name for matching"""
     # Remove common suffixes
-    suffixes = [
-        r'\s+inc\.?$', r'\s+llc\.?$', r'\s+ltd\.?$', r'\s+corp\.?$',
-        r'\s+corporation$', r'\s+company$', r'\s+co\.?$', r'\s+group$',
-        r'\s+holdings?$', r'\s+technologies$', r'\s+technology$',
-        r'\s+solutions$', r'\s+services$', r'\s+international$',
-        r'\s+worldwide$', r'\s+global$', r',.*$'
-    ]
-
     normalized = company.lower().strip()
-    for suffix in suffixes:
-        normalized = re.sub(suffix, '', normalized, flags=re.IGNORECASE)
+    normalized = _SUFFIX_RE.sub('', normalized)
 
     return normalized.strip()
 
@@ -66,86 +223,184 @@ def guess_domain_from_name(company: str) -> Optional[str]:
     normalized = normalize_company_name(company)
 
     # Check known domains
-    for key, domain in KNOWN_DOMAINS.items():
-        if key in normalized or normalized in key:
-            return domain
+    domain = KNOWN_DOMAINS.get(normalized)
+    if domain:
+        return domain
+    domain = _match_known_domain(_WORD_RE.findall(normalized))
+    if domain:
+        return domain
 
     # Try simple transformations
     # Remove spaces and special chars
-    simple = re.sub(r'[^a-z0-9]', '', normalized)
+    simple = _NON_ALNUM_RE.sub('', normalized)
     if simple:
         return f"{simple}.com"
 
     return None
 
 
+def _match_known_domain(words: List[str]) -> Optional[str]:
+    """Find the leftmost (then longest) run of words that is a known company key"""
+    for start, word in enumerate(words):
+        for size in range(min(_KNOWN_MAX_WORDS, len(words) - start), 1, -1):
+            domain = _KNOWN_BY_WORDS.get(' '.join(words[start:start + size]))
+            if domain:
+                return domain
+        domain = _KNOWN_BY_WORDS.get(word)
+        if domain:
+            return domain
+    return None
+
+
 async def search_domain_duckduckgo(company: str, session: aiohttp.ClientSession) -> Optional[str]:
     """Search DuckDuckGo for company domain"""
+    # Words a result domain must contain; without any, no result can match
+    tokens = tuple(word for word in normalize_company_name(company).split() if len(word) > 2)
+    if not tokens:
+        return None
+
     try:
         query = quote_plus(f"{company} official website")
         url = f"https://html.duckduckgo.com/html/?q={query}"
 
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
-        }
-
-        async with session.get(url, headers=headers, timeout=10) as response:
+        async with await request_with_retry(partial(session.get, url, timeout=10)) as response:
             if response.status == 200:
-                text = await response.text()
-                # Extract URLs from results
-                urls = re.findall(r'href="(https?://[^"]+)"', text)
-
-                # Filter for likely company domains
-                normalized = normalize_company_name(company)
-                for url in urls[:10]:
-                    try:
-                        parsed = urlparse(url)
-                        domain = parsed.netloc.lower()
-                        # Skip search engines and common sites
-                        skip = ['duckduckgo', 'google', 'bing', 'yahoo', 'wikipedia',
-                                'linkedin.com', 'facebook.com', 'twitter.com', 'youtube.com',
-                                'glassdoor', 'indeed', 'crunchbase', 'bloomberg']
-                        if any(s in domain for s in skip):
-                            continue
-                        # Check if company name is in domain
-                        domain_base = domain.replace('www.', '')
-                        if any(word in domain_base for word in normalized.split() if len(word) > 2):
-                            return domain_base
-                    except:
-                        continue
+                # Filter result links for likely company domains
+                async with aclosing(_iter_result_hosts(response.content, limit=10)) as hosts:
+                    domain = await _match_company_host(hosts, tokens)
+                # Finish the page so the connection goes back to the pool
+                await _discard_body(response.content)
+                return domain
     except Exception as e:
         pass
 
     return None
 
 
+async def _match_company_host(hosts: AsyncIterator[str], tokens: Tuple[str, ...]) -> Optional[str]:
+    """First result host that isn't a common site and contains one of the company's words"""
+    async for domain in hosts:
+        # Skip search engines and common sites
+        if any(s in domain for s in _SKIP_DOMAINS):
+            continue
+        # Check if company name is in domain
+        domain_base = domain.replace('www.', '')
+        if any(token in domain_base for token in tokens):
+            return domain_base
+    return None
+
+
+async def _discard_body(content: aiohttp.StreamReader) -> None:
+    """
+    Read the rest of a body so aiohttp can reuse its connection, stopping
+    once MAX_SEARCH_BYTES have arrived (a page that big costs a reconnect)
+    """
+    while content.total_bytes < MAX_SEARCH_BYTES and await content.readany():
+        pass
+
+
+async def _iter_result_hosts(content: aiohttp.StreamReader, limit: int) -> AsyncGenerator[str, None]:
+    """
+    Yield up to limit link hosts from a streamed results page, each as soon as it is complete.
+
+    Stops reading after MAX_SEARCH_BYTES so a single page bounds the work.
+    """
+    buf = bytearray()
+    pos = 0
+    count = 0
+    async for chunk in content.iter_chunked(8192):
+        buf += chunk
+        for match in _HREF_HOST_RE.finditer(buf, pos):
+            if match.end() == len(buf):
+                break  # Host may continue in the next chunk
+            pos = match.end()
+            yield match.group(1).decode('ascii', 'ignore').lower()
+            count += 1
+            if count >= limit:
+                return
+        else:
+            # A partial href may straddle the chunk boundary
+            pos = max(pos, len(buf) - len(_HREF_PREFIX))
+        if len(buf) >= MAX_SEARCH_BYTES:
+            return
+
+    # End of body: the last host is complete
+    for match in _HREF_HOST_RE.finditer(buf, pos):
+        yield match.group(1).decode('ascii', 'ignore').lower()
+        count += 1
+        if count >= limit:
+            return
+
+
 async def verify_domain_exists(domain: str, session: aiohttp.ClientSession) -> bool:
     """Verify a domain exists by checking if it resolves"""
-    import dns.resolver
+    cached = _domain_exists_cache.get(domain)
+    if cached is not None:
+        exists, checked_at = cached
+        if exists or time.monotonic() - checked_at < NEGATIVE_CACHE_TTL:
+            return exists
+
+    return await coalesced(_exists_inflight, domain, partial(_check_domain_exists, domain))
+
+
+async def _check_domain_exists(domain: str) -> bool:
+    """Resolve a domain and remember the answer"""
+    exists = await _resolve_domain(domain)
+    _domain_exists_cache[domain] = (exists, time.monotonic())
+    return exists
 
+
+def _get_resolver() -> dns.asyncresolver.Resolver:
+    """Get the shared DNS resolver, reading the system configuration once"""
+    global _resolver
+    if _resolver is None:
+        _resolver = dns.asyncresolver.Resolver()
+        _resolver.timeout = 3
+        _resolver.lifetime = 5
+    return _resolver
+
+
+async def _resolve_domain(domain: str) -> bool:
+    """Check whether a domain has MX or A records"""
+    resolver = _get_resolver()
     try:
         # Check MX records (indicates email capability)
-        dns.resolver.resolve(domain, 'MX')
+        await resolver.resolve(domain, 'MX')
         return True
-    except:
+    except dns.exception.DNSException:
         try:
             # Fallback to A record
-            dns.resolver.resolve(domain, 'A')
+            await resolver.resolve(domain, 'A')
             return True
-        except:
+        except dns.exception.DNSException:
             return False
 
 
-async def find_domain(company: str, session: aiohttp.ClientSession, cache: dict = None) -> Optional[str]:
-    """Find domain for a company name"""
+async def find_domain(
+    company: str,
+    session: Optional[aiohttp.ClientSession] = None,
+    cache: Optional[MutableMapping[str, Optional[str]]] = None,
+) -> Optional[str]:
+    """Find domain for a company name (uses the shared session if none is given)"""
     if not company or company.strip() == '':
         return None
 
     # Check cache first
     cache_key = normalize_company_name(company)
-    if cache and cache_key in cache:
+    if cache is not None and cache_key in cache:
         return cache[cache_key]
 
+    if session is None:
+        session = await get_session()
+
+    # Concurrent calls for the same company share one lookup
+    return await coalesced(_inflight, cache_key, partial(_lookup_domain, company, cache_key, session, cache))
+
+
+async def _lookup_domain(
+    company: str, cache_key: str, session: aiohttp.ClientSession, cache: Optional[MutableMapping[str, Optional[str]]]
+) -> Optional[str]:
+    """Resolve a company's domain by guessing, then searching"""
     # Try direct guess first (fast)
     guessed = guess_domain_from_name(company)
     if guessed:
@@ -164,22 +419,56 @@ async def find_domain(company: str, session: aiohttp.ClientSession, cache: dict
                 cache[cache_key] = searched
             return searched
 
-    # Return guessed domain even if we couldn't verify
+    # Return guessed domain even if we couldn't verify. It isn't cached: DNS or
+    # the search may just have been unreachable, and a cache can outlive the run.
     if guessed:
-        if cache is not None:
-            cache[cache_key] = guessed
         return guessed
 
+    # Nothing to guess or search with, which won't change on a later run
+    if cache is not None:
+        cache[cache_key] = None
     return None
 
 
+async def find_domains(
+    companies: List[str],
+    session: Optional[aiohttp.ClientSession] = None,
+    cache: Optional[MutableMapping[str, Optional[str]]] = None,
+    concurrency: int = 20,
+) -> List[Optional[str]]:
+    """
+    Find domains for many companies concurrently.
+
+    Each distinct normalized company name is looked up once; results are
+    returned in the same order as the input list.
+    """
+    if session is None:
+        session = await get_session()
+    if cache is None:
+        cache = {}
+
+    keys = [normalize_company_name(c) if c and c.strip() else None for c in companies]
+    unique: Dict[str, str] = {}
+    for key, company in zip(keys, companies):
+        if key is not None:
+            unique.setdefault(key, company)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def lookup(key: str, company: str) -> Tuple[str, Optional[str]]:
+        async with semaphore:
+            return key, await find_domain(company, session, cache)
+
+    resolved = dict(await asyncio.gather(*[lookup(k, c) for k, c in unique.items()]))
+    return [resolved.get(key) if key is not None else None for key in keys]
+
+
 # Test
 if __name__ == "__main__":
     async def test():
-        async with aiohttp.ClientSession() as session:
-            companies = ["Microsoft", "Acme Corp", "Spotify", "Some Random Startup LLC"]
-            for company in companies:
-                domain = await find_domain(company, session)
-                print(f"{company} -> {domain}")
+        companies = ["Microsoft", "Acme Corp", "Spotify", "Some Random Startup LLC"]
+        for company, domain in zip(companies, await find_domains(companies)):
+            print(f"{company} -> {domain}")
+        await close_session()
 
     asyncio.run(test())
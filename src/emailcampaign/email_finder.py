@@ -4,28 +4,63 @@ LinkedIn Email Finder
 Finds and verifies email addresses for LinkedIn connections.
 
 Usage:
-    python email_finder.py input.csv output.csv
+    python -m emailcampaign.email_finder input.csv output.csv
 
 Input CSV should have columns: First Name, Last Name, Company
 Output CSV will have an additional 'Found Email' column
 """
 import asyncio
 import argparse
-import pandas as pd
+import csv
 import aiohttp
 from tqdm import tqdm
-from typing import Optional, Dict, List
+from typing import Any, AsyncGenerator, AsyncIterator, MutableMapping, Optional, Dict, List, TextIO, Tuple
+from collections import defaultdict
+from contextlib import aclosing
 from dataclasses import dataclass
 import json
 import os
 from datetime import datetime
 
-from domain_finder import find_domain
-from pattern_generator import generate_email_patterns
-from email_verifier import verify_email_smtp, VerificationResult, quick_syntax_check
-
-
-@dataclass
+from .domain_finder import find_domain, find_domains, get_session, close_session
+from .pattern_generator import generate_email_patterns_batch
+from .email_verifier import (
+    EmailVerification,
+    verify_emails_on_domain,
+    verify_email_mx_only,
+    probe_port25_available,
+    smtp_sessions,
+    VerificationResult,
+    quick_syntax_check,
+)
+
+# Columns a LinkedIn export must have
+REQUIRED_COLUMNS = ['First Name', 'Last Name', 'Company']
+
+# Columns added to the input CSV
+RESULT_COLUMNS = ['Found Email', 'Email Status', 'Domain']
+
+# Contacts verified together in one verify_emails_on_domain call, which splits
+# their ~8 patterns each into short SMTP transactions
+CONTACTS_PER_BATCH = 12
+
+# Completed rows are appended to <output>.journal.csv as they finish, so an
+# interrupted run can resume; the journal is removed once the output is written
+JOURNAL_SUFFIX = '.journal.csv'
+JOURNAL_COLUMNS = ['idx', 'found_email', 'status', 'domain', 'patterns_tried']
+
+# Stats counters that a result with each status adds to
+STATUS_STATS: Dict[str, Tuple[str, ...]] = {
+    'verified': ('found', 'verified'),
+    'catch_all': ('found', 'catch_all'),
+    'mx_only': ('found', 'mx_only'),
+    'unverified': ('found',),
+    'no_domain': ('no_domain',),
+    'not_found': ('no_match',),
+}
+
+
+@dataclass(slots=True)
 class ContactResult:
     first_name: str
     last_name: str
@@ -36,16 +71,171 @@ class ContactResult:
     patterns_tried: int
 
 
+def read_linkedin_csv(path: str) -> Tuple[List[str], List[Dict[str, str]]]:
+    """
+    Read a LinkedIn connections export.
+
+    Args:
+        path: CSV file, including LinkedIn's 3-line notes preamble
+
+    Returns:
+        The column names (whitespace stripped) and one dict per row
+    """
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for _ in range(3):  # LinkedIn CSVs have 3 header rows
+            next(f, None)
+        reader = csv.DictReader(f, restval='')
+        fieldnames = [name.strip() for name in reader.fieldnames or []]
+        reader.fieldnames = fieldnames
+        return fieldnames, list(reader)
+
+
+def write_results(
+    path: str, fieldnames: List[str], rows: List[Dict[str, str]], results: List[Optional[ContactResult]]
+) -> None:
+    """Write the input rows with RESULT_COLUMNS filled in from each row's result"""
+    out_fields = fieldnames + [col for col in RESULT_COLUMNS if col not in fieldnames]
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=out_fields, extrasaction='ignore')
+        writer.writeheader()
+        for row, result in zip(rows, results):
+            out: Dict[str, Any] = dict(row)
+            if result is not None:
+                out.update({
+                    'Found Email': result.found_email,
+                    'Email Status': result.verification_status,
+                    'Domain': result.domain,
+                })
+            writer.writerow(out)
+
+
+class ResultJournal:
+    """
+    Append-only log of finished contacts, one line each, so progress is
+    saved without rewriting the output and an interrupted run can resume.
+
+    The first line identifies the input file (path, size and mtime); a
+    journal left by a run over a different or since-edited input is ignored
+    and started afresh.
+    """
+
+    def __init__(self, path: str, input_path: str):
+        self.path = path
+        self.input_path = input_path
+        self._resume = False
+        self._file: Optional[TextIO] = None
+        self._writer: Any = None
+
+    def _source_line(self) -> str:
+        """First line of the journal, identifying the input it belongs to"""
+        stat = os.stat(self.input_path)
+        return f"# input={os.path.abspath(self.input_path)} size={stat.st_size} mtime_ns={stat.st_mtime_ns}\n"
+
+    def read(self, n: int) -> Dict[int, Tuple[Optional[str], str, Optional[str], int]]:
+        """
+        Read the results left behind by an interrupted run over the same input.
+
+        Args:
+            n: Number of rows in the input, larger indices are ignored
+
+        Returns:
+            (found email, status, domain, patterns tried) by input row index;
+            empty if there is no journal or it belongs to another input
+        """
+        done: Dict[int, Tuple[Optional[str], str, Optional[str], int]] = {}
+        try:
+            with open(self.path, newline='', encoding='utf-8') as f:
+                if f.readline() != self._source_line():
+                    print(f"Ignoring {self.path}: it was written for a different or changed input")
+                    return done
+                self._resume = True
+                for row in csv.DictReader(f, restval=''):
+                    try:
+                        i, tried = int(row['idx']), int(row['patterns_tried'])
+                    except (TypeError, ValueError):
+                        continue  # Torn last line from a crash
+                    if 0 <= i < n and row['status']:
+                        done[i] = (row['found_email'] or None, row['status'], row['domain'] or None, tried)
+        except FileNotFoundError:
+            pass
+        return done
+
+    def open(self) -> None:
+        """Open for appending after read(), or start a new journal if there was nothing to resume"""
+        self._file = open(self.path, 'a' if self._resume else 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        if not self._resume:
+            self._file.write(self._source_line())
+            self._writer.writerow(JOURNAL_COLUMNS)
+
+    def append(self, results: List[Tuple[int, ContactResult]]) -> None:
+        """Record finished contacts by input row index"""
+        if self._file is None:
+            raise RuntimeError("Journal is not open")
+        self._writer.writerows(
+            (i, result.found_email or '', result.verification_status, result.domain or '', result.patterns_tried)
+            for i, result in results
+        )
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self) -> None:
+        """Delete the journal once the output it backs up has been written"""
+        os.remove(self.path)
+
+
+def _domain_batches(by_domain: Dict[str, List[int]]) -> List[Tuple[str, List[int]]]:
+    """
+    Split each domain's contacts into batches of CONTACTS_PER_BATCH,
+    interleaved across domains so workers don't queue on one domain
+    """
+    batches = sorted(
+        (
+            (start, domain, indices[start:start + CONTACTS_PER_BATCH])
+            for domain, indices in by_domain.items()
+            for start in range(0, len(indices), CONTACTS_PER_BATCH)
+        ),
+        key=lambda batch: batch[0]
+    )
+    return [(domain, indices) for _, domain, indices in batches]
+
+
+def _unresolved(first_name: str, last_name: str, company: str, status: str) -> ContactResult:
+    """Result for a contact that never got as far as email patterns"""
+    return ContactResult(
+        first_name=first_name,
+        last_name=last_name,
+        company=company,
+        domain=None,
+        found_email=None,
+        verification_status=status,
+        patterns_tried=0
+    )
+
+
 class LinkedInEmailFinder:
-    def __init__(self, concurrency: int = 3, verify: bool = True):
+    def __init__(
+        self,
+        concurrency: int = 3,
+        verify: bool = True,
+        domain_cache: Optional[MutableMapping[str, Optional[str]]] = None,
+        domain_concurrency: int = 20,
+    ):
         self.concurrency = concurrency
+        self.domain_concurrency = domain_concurrency  # Domain lookups are cheap HTTP/DNS calls, not SMTP
         self.verify = verify
-        self.domain_cache: Dict[str, str] = {}
+        self.domain_cache: MutableMapping[str, Optional[str]] = domain_cache if domain_cache is not None else {}
+        self._port25_ok: Optional[bool] = None  # Set by iter_csv before verifying
         self.stats = {
             'total': 0,
             'found': 0,
             'verified': 0,
             'catch_all': 0,
+            'mx_only': 0,
             'no_domain': 0,
             'no_match': 0,
         }
@@ -61,33 +251,69 @@ class LinkedInEmailFinder:
 
         # Skip if missing required fields
         if not first_name or not last_name or not company:
-            return ContactResult(
-                first_name=first_name or "",
-                last_name=last_name or "",
-                company=company or "",
-                domain=None,
-                found_email=None,
-                verification_status="missing_data",
-                patterns_tried=0
-            )
+            return _unresolved(first_name or "", last_name or "", company or "", "missing_data")
 
         # Find domain
         domain = await find_domain(company, session, self.domain_cache)
         if not domain:
-            self.stats['no_domain'] += 1
-            return ContactResult(
-                first_name=first_name,
-                last_name=last_name,
-                company=company,
-                domain=None,
-                found_email=None,
-                verification_status="no_domain",
-                patterns_tried=0
-            )
+            self._count("no_domain")
+            return _unresolved(first_name, last_name, company, "no_domain")
 
-        # Generate email patterns
-        patterns = generate_email_patterns(first_name, last_name, domain)
+        return (await self.find_emails_at_domain(domain, [(first_name, last_name, company)]))[0]
 
+    async def find_emails_at_domain(
+        self,
+        domain: str,
+        contacts: List[Tuple[str, str, str]]
+    ) -> List[ContactResult]:
+        """
+        Find emails for several contacts whose company uses the same domain.
+
+        The candidate patterns of every contact are verified together, so the
+        whole batch shares one SMTP transaction and one catch-all probe.
+
+        Args:
+            domain: Company email domain
+            contacts: (first name, last name, company) for each contact
+
+        Returns:
+            One ContactResult per contact, in the same order
+        """
+        patterns = generate_email_patterns_batch([(first, last) for first, last, _ in contacts], domain)
+        candidates: List[List[str]] = [[] for _ in contacts]
+        checks: List[List[EmailVerification]] = [[] for _ in contacts]
+        mx_ok = False
+
+        if self.verify and self._port25_ok is False:
+            # Port 25 is blocked, so SMTP can't tell patterns apart; just check
+            # the domain can receive email and go with the most common pattern
+            top = next((p[0] for p in patterns if p), None)
+            if top is not None:
+                mx_ok = (await verify_email_mx_only(top)).result is VerificationResult.VALID
+        elif self.verify:
+            # Verify the top 8 patterns of every contact over one SMTP session
+            candidates = [[email for email in p[:8] if quick_syntax_check(email)] for p in patterns]
+            verified = iter(await verify_emails_on_domain(
+                domain, [email for emails in candidates for email in emails], timeout=10
+            ))
+            checks = [[next(verified) for _ in emails] for emails in candidates]
+
+        return [
+            self._choose_email(*contact, domain, p, c, mx_ok)
+            for contact, p, c in zip(contacts, patterns, checks)
+        ]
+
+    def _choose_email(
+        self,
+        first_name: str,
+        last_name: str,
+        company: str,
+        domain: str,
+        patterns: List[str],
+        checks: List[EmailVerification],
+        mx_ok: bool
+    ) -> ContactResult:
+        """Pick a contact's email from its patterns and their verification results"""
         if not patterns:
             return ContactResult(
                 first_name=first_name,
@@ -101,7 +327,7 @@ class LinkedInEmailFinder:
 
         # If not verifying, return first pattern
         if not self.verify:
-            self.stats['found'] += 1
+            self._count("unverified")
             return ContactResult(
                 first_name=first_name,
                 last_name=last_name,
@@ -112,29 +338,33 @@ class LinkedInEmailFinder:
                 patterns_tried=1
             )
 
-        # Try to verify each pattern
-        for i, email in enumerate(patterns[:8]):  # Limit to top 8 patterns
-            if not quick_syntax_check(email):
-                continue
-
-            result = await verify_email_smtp(email, timeout=10)
+        if self._port25_ok is False:
+            self._count("mx_only" if mx_ok else "not_found")
+            return ContactResult(
+                first_name=first_name,
+                last_name=last_name,
+                company=company,
+                domain=domain,
+                found_email=patterns[0] if mx_ok else None,
+                verification_status="mx_only" if mx_ok else "not_found",
+                patterns_tried=1
+            )
 
-            if result.result == VerificationResult.VALID:
-                self.stats['verified'] += 1
-                self.stats['found'] += 1
+        for i, result in enumerate(checks):
+            if result.result is VerificationResult.VALID:
+                self._count("verified")
                 return ContactResult(
                     first_name=first_name,
                     last_name=last_name,
                     company=company,
                     domain=domain,
-                    found_email=email,
+                    found_email=result.email,
                     verification_status="verified",
                     patterns_tried=i + 1
                 )
-            elif result.result == VerificationResult.CATCH_ALL:
+            elif result.result is VerificationResult.CATCH_ALL:
                 # Domain accepts all, return most likely pattern
-                self.stats['catch_all'] += 1
-                self.stats['found'] += 1
+                self._count("catch_all")
                 return ContactResult(
                     first_name=first_name,
                     last_name=last_name,
@@ -145,11 +375,8 @@ class LinkedInEmailFinder:
                     patterns_tried=i + 1
                 )
 
-            # Small delay between verification attempts
-            await asyncio.sleep(0.5)
-
         # No valid email found
-        self.stats['no_match'] += 1
+        self._count("not_found")
         return ContactResult(
             first_name=first_name,
             last_name=last_name,
@@ -157,9 +384,14 @@ class LinkedInEmailFinder:
             domain=domain,
             found_email=None,
             verification_status="not_found",
-            patterns_tried=len(patterns[:8])
+            patterns_tried=len(checks)
         )
 
+    def _count(self, status: str) -> None:
+        """Add a result with this status to the stats"""
+        for key in STATUS_STATS.get(status, ()):
+            self.stats[key] += 1
+
     async def process_csv(
         self,
         input_path: str,
@@ -167,68 +399,175 @@ class LinkedInEmailFinder:
         progress_callback=None
     ) -> Dict:
         """Process a LinkedIn CSV file"""
+        async for _ in self.iter_csv(input_path, output_path):
+            pass
 
-        # Read CSV
-        print(f"\nReading {input_path}...")
-        df = pd.read_csv(input_path, skiprows=3)  # LinkedIn CSVs have 3 header rows
+        self.print_summary()
+        return self.stats
 
-        # Normalize column names
-        df.columns = df.columns.str.strip()
+    async def iter_csv(
+        self,
+        input_path: str,
+        output_path: str
+    ) -> AsyncIterator[Tuple[Dict[str, Any], ContactResult]]:
+        """
+        Process a LinkedIn CSV file, yielding each input row with its result
+        as soon as that contact is done (in completion order).
+
+        The output CSV is written exactly as process_csv does. Rows finished
+        by an earlier, interrupted run over the same input and output are
+        taken from its journal: they are yielded (and counted in stats)
+        first, without being looked up again.
+        """
+
+        # Read CSV in a worker thread so a large export doesn't stall the event loop
+        print(f"\nReading {input_path}...")
+        fieldnames, rows = await asyncio.to_thread(read_linkedin_csv, input_path)
 
         # Check for required columns
-        required = ['First Name', 'Last Name', 'Company']
-        for col in required:
-            if col not in df.columns:
+        for col in REQUIRED_COLUMNS:
+            if col not in fieldnames:
                 raise ValueError(f"Missing required column: {col}")
 
-        self.stats['total'] = len(df)
-        print(f"Found {len(df)} contacts to process\n")
-
-        # Add new columns
-        df['Found Email'] = None
-        df['Email Status'] = None
-        df['Domain'] = None
-
-        # Process contacts
-        async with aiohttp.ClientSession() as session:
-            semaphore = asyncio.Semaphore(self.concurrency)
-
-            async def process_row(idx, row):
-                async with semaphore:
-                    result = await self.find_email_for_contact(
-                        str(row.get('First Name', '')).strip(),
-                        str(row.get('Last Name', '')).strip(),
-                        str(row.get('Company', '')).strip(),
-                        session
-                    )
-                    return idx, result
-
-            # Create tasks
-            tasks = [
-                process_row(idx, row)
-                for idx, row in df.iterrows()
-            ]
+        n = len(rows)
+        self.stats['total'] = n
+        print(f"Found {n} contacts to process\n")
+
+        await self._check_port25()
+
+        # Pull the inputs out as plain lists
+        firsts, lasts, companies = ([(row[col] or '').strip() for row in rows] for col in REQUIRED_COLUMNS)
+        contacts = list(zip(firsts, lasts, companies))
+
+        # Results are collected here and written as extra columns
+        results: List[Optional[ContactResult]] = [None] * n
+
+        # Resume from the journal of an interrupted run, then keep appending to it
+        journal = ResultJournal(output_path + JOURNAL_SUFFIX, input_path)
+        resumed = [
+            (i, ContactResult(*contacts[i], domain, email, status, tried))
+            for i, (email, status, domain, tried) in (await asyncio.to_thread(journal.read, n)).items()
+        ]
+        for i, result in resumed:
+            results[i] = result
+            self._count(result.verification_status)
+        if resumed:
+            print(f"Resuming: {len(resumed)} contacts already done in {journal.path}\n")
+
+        session = await get_session()
+        journal.open()
+        try:
+            ready, by_domain = await self._group_by_domain(
+                contacts, [i for i in range(n) if results[i] is None], session
+            )
+            batches = self._find_in_batches(contacts, ready, _domain_batches(by_domain))
 
             # Process with progress bar
-            results = []
-            with tqdm(total=len(tasks), desc="Finding emails") as pbar:
-                for coro in asyncio.as_completed(tasks):
-                    idx, result = await coro
-                    df.at[idx, 'Found Email'] = result.found_email
-                    df.at[idx, 'Email Status'] = result.verification_status
-                    df.at[idx, 'Domain'] = result.domain
-                    results.append(result)
-                    pbar.update(1)
-
-                    # Save progress periodically
-                    if len(results) % 50 == 0:
-                        df.to_csv(output_path, index=False)
-
-        # Final save
-        df.to_csv(output_path, index=False)
+            with tqdm(total=n, initial=len(resumed), desc="Finding emails") as pbar:
+                # Hand on what the interrupted run found (it may not have been synced yet)
+                for i, result in resumed:
+                    yield rows[i], result
+
+                async with aclosing(batches):
+                    async for batch in batches:
+                        # Record progress once per row instead of rewriting the output
+                        journal.append(batch)
+                        for i, result in batch:
+                            results[i] = result
+                            pbar.update(1)
+                            yield rows[i], result
+        finally:
+            journal.close()
+            await close_session()
+
+        # Write the output once, then drop the journal it supersedes
+        await asyncio.to_thread(write_results, output_path, fieldnames, rows, results)
+        journal.remove()
         print(f"\nResults saved to {output_path}")
 
-        # Print stats
+    async def _check_port25(self) -> None:
+        """Check once up front instead of letting every SMTP probe time out"""
+        if self.verify and self._port25_ok is None:
+            self._port25_ok = await probe_port25_available()
+            if not self._port25_ok:
+                print("Warning: outbound port 25 is blocked, so emails can't be verified over SMTP.")
+                print("Only checking that each domain accepts mail (most common pattern per contact).\n")
+
+    async def _group_by_domain(
+        self,
+        contacts: List[Tuple[str, str, str]],
+        indices: List[int],
+        session: aiohttp.ClientSession
+    ) -> Tuple[List[Tuple[int, ContactResult]], Dict[str, List[int]]]:
+        """
+        Resolve each distinct company once, with its own higher concurrency,
+        so slow lookups don't hold up SMTP verification. Returns results for
+        the contacts that can't be looked up, and the rest grouped by domain.
+        """
+        print("Finding company domains...")
+        complete = [i for i in indices if all(contacts[i])]
+        row_domains = dict(zip(complete, await find_domains(
+            [contacts[i][2] for i in complete], session, self.domain_cache, concurrency=self.domain_concurrency
+        )))
+
+        ready: List[Tuple[int, ContactResult]] = []
+        by_domain: Dict[str, List[int]] = defaultdict(list)
+        for i in indices:
+            if i not in row_domains:
+                ready.append((i, _unresolved(*contacts[i], "missing_data")))
+            elif (domain := row_domains[i]) is None:
+                self._count("no_domain")
+                ready.append((i, _unresolved(*contacts[i], "no_domain")))
+            else:
+                by_domain[domain].append(i)
+        print(
+            f"Resolved {len(by_domain)} unique domains "
+            f"({sum(map(len, by_domain.values()))} of {len(complete)} contacts)\n"
+        )
+        return ready, by_domain
+
+    async def _find_in_batches(
+        self,
+        contacts: List[Tuple[str, str, str]],
+        ready: List[Tuple[int, ContactResult]],
+        batches: List[Tuple[str, List[int]]]
+    ) -> AsyncGenerator[List[Tuple[int, ContactResult]], None]:
+        """
+        Yield the ready results, then run per-domain batches on `concurrency`
+        workers (so one SMTP transaction and catch-all probe covers several
+        colleagues), yielding each batch's (index, result) pairs as it finishes.
+        """
+        if ready:
+            yield ready
+
+        pending = iter(batches)
+        completed: asyncio.Queue = asyncio.Queue()
+
+        async def worker():
+            for domain, indices in pending:
+                try:
+                    results = await self.find_emails_at_domain(domain, [contacts[i] for i in indices])
+                except Exception as e:
+                    completed.put_nowait(e)
+                    return
+                completed.put_nowait(list(zip(indices, results)))
+
+        # Keep each domain's SMTP session open across its batches
+        async with smtp_sessions():
+            workers = [asyncio.create_task(worker()) for _ in range(min(self.concurrency, len(batches)))]
+            try:
+                for _ in batches:
+                    batch = await completed.get()
+                    if isinstance(batch, Exception):
+                        raise batch
+                    yield batch
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+
+    def print_summary(self) -> None:
+        """Print the results summary for the last processed file"""
         print("\n" + "="*50)
         print("RESULTS SUMMARY")
         print("="*50)
@@ -236,13 +575,12 @@ class LinkedInEmailFinder:
         print(f"Emails found:       {self.stats['found']}")
         print(f"  - Verified:       {self.stats['verified']}")
         print(f"  - Catch-all:      {self.stats['catch_all']}")
+        print(f"  - MX only:        {self.stats['mx_only']}")
         print(f"No domain found:    {self.stats['no_domain']}")
         print(f"No email matched:   {self.stats['no_match']}")
         print(f"Success rate:       {self.stats['found']/max(self.stats['total'],1)*100:.1f}%")
         print("="*50)
 
-        return self.stats
-
 
 async def main():
     parser = argparse.ArgumentParser(
@@ -258,6 +596,10 @@ async def main():
         '--concurrency', type=int, default=3,
         help='Number of concurrent lookups (default: 3)'
     )
+    parser.add_argument(
+        '--domain-concurrency', type=int, default=20,
+        help='Number of concurrent company domain lookups (default: 20)'
+    )
 
     args = parser.parse_args()
 
@@ -268,7 +610,8 @@ async def main():
 
     finder = LinkedInEmailFinder(
         concurrency=args.concurrency,
-        verify=not args.no_verify
+        verify=not args.no_verify,
+        domain_concurrency=args.domain_concurrency
     )
 
     await finder.process_csv(args.input, args.output)
@@ -2,12 +2,19 @@
 Email Verifier - Verifies if email addresses exist using SMTP
 """
 import asyncio
-import dns.resolver
+import time
+import dns.asyncresolver
+import dns.exception
 import socket
+import struct
 import re
-from typing import Optional, Tuple, Dict
+from typing import AsyncIterator, Optional, Tuple, Dict, List
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
 from enum import Enum
+from functools import partial
+
+from .coalesce import coalesced
 
 
 class VerificationResult(Enum):
@@ -17,29 +24,88 @@ class VerificationResult(Enum):
     UNKNOWN = "unknown"       # Couldn't determine (timeout, blocked, etc.)
 
 
-@dataclass
+@dataclass(slots=True)
 class EmailVerification:
     email: str
     result: VerificationResult
     message: str
 
 
-# Cache for MX records
-mx_cache: Dict[str, list] = {}
+# Domain -> (MX hosts, checked_at). Domains without MX records are retried sooner.
+mx_cache: Dict[str, Tuple[list, float]] = {}
+MX_CACHE_TTL = 3600
+MX_NEGATIVE_CACHE_TTL = 300
+MX_CACHE_SIZE = 10000
+
+# Domain -> MX lookup currently running for it
+_mx_inflight: Dict[str, asyncio.Future] = {}
+
+# Shared resolver with bounded per-query time (see _get_resolver)
+_resolver: Optional[dns.asyncresolver.Resolver] = None
+
+SMTP_PORT = 25
+
+# Well-known mail server used to check whether outbound port 25 is open at all
+PORT25_PROBE_HOST = "gmail-smtp-in.l.google.com"
+
+# Local part that should not exist anywhere; if a server accepts it, it accepts everything
+CATCH_ALL_LOCAL_PART = "nonexistent_user_test_12345"
+
+# Domain -> whether its server accepts mail for any address (probed once per domain)
+_catch_all_cache: Dict[str, bool] = {}
+
+# Recipients per SMTP transaction, and rejected recipients per session before it is
+# replaced. Servers drop clients that pile up errors (Postfix starts delaying at 10
+# and hangs up at 20), and most of the addresses we probe are rejected.
+MAX_RECIPIENTS = 9
+MAX_SESSION_REJECTIONS = 9
+
+# Idle SMTP sessions kept open for reuse, one per domain (see verify_emails_on_domain)
+SMTP_POOL_SIZE = 10
+_smtp_pool: Dict[str, "_SmtpConnection"] = {}
+_smtp_locks: Dict[str, asyncio.Lock] = {}
+_smtp_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Open smtp_sessions() blocks; idle sessions are closed when the last one exits
+_smtp_users = 0
 
 
 async def get_mx_records(domain: str) -> list:
-    """Get MX records for a domain"""
-    if domain in mx_cache:
-        return mx_cache[domain]
+    """Get MX records for a domain (concurrent lookups for a domain share one query)"""
+    cached = mx_cache.get(domain)
+    if cached is not None:
+        hosts, checked_at = cached
+        if time.monotonic() - checked_at < (MX_CACHE_TTL if hosts else MX_NEGATIVE_CACHE_TTL):
+            return hosts
+
+    return await coalesced(_mx_inflight, domain, partial(_resolve_mx, domain))
+
 
+def _get_resolver() -> dns.asyncresolver.Resolver:
+    """Get the shared DNS resolver, reading the system configuration once"""
+    global _resolver
+    if _resolver is None:
+        _resolver = dns.asyncresolver.Resolver()
+        _resolver.timeout = 3
+        _resolver.lifetime = 5
+    return _resolver
+
+
+async def _resolve_mx(domain: str) -> list:
+    """Look up MX hosts, most preferred first; empty if the domain has none"""
     try:
-        records = dns.resolver.resolve(domain, 'MX')
+        records = await _get_resolver().resolve(domain, 'MX')
         mx_hosts = sorted([(r.preference, str(r.exchange).rstrip('.')) for r in records])
-        mx_cache[domain] = [host for _, host in mx_hosts]
-        return mx_cache[domain]
-    except Exception as e:
-        return []
+        hosts = [host for _, host in mx_hosts]
+    except dns.exception.DNSException:
+        hosts = []
+
+    # Re-insert so the oldest entries are first in line for eviction
+    mx_cache.pop(domain, None)
+    mx_cache[domain] = (hosts, time.monotonic())
+    if len(mx_cache) > MX_CACHE_SIZE:
+        del mx_cache[next(iter(mx_cache))]
+    return hosts
 
 
 async def verify_email_mx_only(email: str) -> EmailVerification:
@@ -59,112 +125,343 @@ async def verify_email_mx_only(email: str) -> EmailVerification:
         return EmailVerification(email, VerificationResult.INVALID, "No MX records - domain cannot receive email")
 
 
+async def probe_port25_available(host: str = PORT25_PROBE_HOST, timeout: float = 3) -> bool:
+    """
+    Check whether this machine can open outbound SMTP connections.
+
+    Many cloud providers and ISPs block port 25, in which case every SMTP
+    check would just wait out its timeout.
+    """
+    try:
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, SMTP_PORT),
+            timeout=timeout
+        )
+    except (OSError, asyncio.TimeoutError):
+        return False
+
+    _tune_smtp_socket(writer)
+    writer.close()
+    try:
+        await asyncio.wait_for(writer.wait_closed(), timeout=1)
+    except (OSError, asyncio.TimeoutError):
+        pass
+    return True
+
+
 async def verify_email_smtp(email: str, timeout: int = 10) -> EmailVerification:
     """
     Verify an email address exists using SMTP.
 
     This works by:
     1. Finding the MX records for the domain
-    2. Connecting to the mail server
+    2. Connecting to the mail server (or reusing an open session)
     3. Sending RCPT TO command to check if recipient exists
 
-    Note: Many servers block this or return catch-all responses.
+    Note: Many servers block this or return catch-all responses. To check
+    several addresses at one domain, use verify_emails_on_domain.
     """
     if not email or '@' not in email:
         return EmailVerification(email, VerificationResult.INVALID, "Invalid email format")
 
     local_part, domain = email.rsplit('@', 1)
+    return (await verify_emails_on_domain(domain, [email], timeout))[0]
+
+
+@dataclass(slots=True)
+class _SmtpConnection:
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+    pipelining: bool  # Server advertised PIPELINING in its EHLO reply
+    rejections: int = 0  # RCPTs the server has refused on this session
+
+
+async def verify_emails_on_domain(domain: str, emails: List[str], timeout: int = 10) -> List[EmailVerification]:
+    """
+    Verify several addresses at one domain over a single SMTP session.
+
+    All RCPT TO probes, preceded by a catch-all probe the first time a
+    domain is seen, go out MAX_RECIPIENTS per transaction (pipelined when
+    the server supports it) instead of one connection per address, with
+    a fresh session whenever the current one has refused too many. Inside smtp_sessions() the session is then
+    kept open for later calls for the same domain; concurrent calls for a
+    domain take turns on it.
+
+    Args:
+        domain: Domain every email belongs to
+        emails: Addresses to check
+        timeout: Seconds to wait for the connection and for each reply
+
+    Returns:
+        One EmailVerification per email, in the same order
+    """
+    if not emails:
+        return []
+
+    # A known catch-all domain accepts every address, so there is nothing to check
+    if _catch_all_cache.get(domain):
+        return _catch_all_results(emails)
 
-    # Get MX records
     mx_hosts = await get_mx_records(domain)
     if not mx_hosts:
-        return EmailVerification(email, VerificationResult.UNKNOWN, "No MX records found")
+        return [EmailVerification(email, VerificationResult.UNKNOWN, "No MX records found") for email in emails]
+
+    async with smtp_sessions(), _get_smtp_lock(domain):
+        # Look again: a call we waited on may have just probed this domain
+        catch_all = _catch_all_cache.get(domain)
+        if catch_all:
+            return _catch_all_results(emails)
 
-    # Try each MX host
-    for mx_host in mx_hosts[:2]:  # Try top 2 MX servers
+        # Probe a fake address ahead of the real ones, unless this domain was already probed
+        probe = [f"{CATCH_ALL_LOCAL_PART}@{domain}"] if catch_all is None else []
         try:
-            result = await _check_smtp(email, mx_host, timeout)
-            if result.result != VerificationResult.UNKNOWN:
-                return result
-        except Exception as e:
-            continue
+            replies = await _probe_domain(domain, mx_hosts, probe + emails, timeout)
+        except (ValueError, ConnectionError) as e:
+            # The server broke the protocol (e.g. a reply line over the stream
+            # limit) or hung up partway; its session is already closed and out
+            # of the pool. It does talk SMTP, so MX-only "valid" would be wrong.
+            return [EmailVerification(email, VerificationResult.UNKNOWN, f"SMTP error: {e}") for email in emails]
+
+    if replies is None:
+        # Fallback to MX-only verification if SMTP is blocked
+        return [await verify_email_mx_only(email) for email in emails]
+
+    if probe:
+        probe_reply, replies = replies[0], replies[1:]
+        catch_all = probe_reply.startswith(b'250')
+        # Only cache a definite answer; a 4xx (e.g. greylisting) is probed again next time
+        if catch_all or probe_reply.startswith(b'5'):
+            _catch_all_cache[domain] = catch_all
+    return [_rcpt_verification(email, reply, bool(catch_all)) for email, reply in zip(emails, replies)]
+
+
+async def _probe_domain(domain: str, mx_hosts: List[str], recipients: List[str], timeout: int) -> Optional[List[bytes]]:
+    """
+    RCPT replies for every recipient, over the domain's pooled session.
+
+    Recipients go out MAX_RECIPIENTS per transaction, and a session is
+    swapped for a fresh one before it could pass MAX_SESSION_REJECTIONS,
+    so the server's error limit is never reached. A dropped session is
+    reconnected once per transaction. None if no MX host would take a
+    session at all; ConnectionError if the server hung up partway. Call
+    with the domain's lock held.
+    """
+    replies: List[bytes] = []
+    conn = _smtp_pool.pop(domain, None)
+    for start in range(0, len(recipients), MAX_RECIPIENTS):
+        chunk = recipients[start:start + MAX_RECIPIENTS]
+        if conn is not None and conn.rejections + len(chunk) > MAX_SESSION_REJECTIONS:
+            await _close_smtp(conn)
+            conn = None
+        chunk_replies = None
+        if conn is not None:
+            chunk_replies = await _probe_recipients(conn, chunk, timeout)
+        if chunk_replies is None:
+            # No session yet, a spent one, or the server dropped the one we had
+            conn = await _open_smtp(mx_hosts[:2], timeout)
+            if conn is None and not replies:
+                return None
+            if conn is not None:
+                chunk_replies = await _probe_recipients(conn, chunk, timeout)
+            if chunk_replies is None:
+                raise ConnectionError("server ended the session partway through")
+        replies.extend(chunk_replies)
+
+    if conn is not None:
+        await _release_smtp(domain, conn)
+    return replies
+
+
+def _catch_all_results(emails: List[str]) -> List[EmailVerification]:
+    """Results for addresses at a domain known to accept all mail"""
+    return [EmailVerification(email, VerificationResult.CATCH_ALL, "Domain accepts all emails") for email in emails]
+
+
+def _rcpt_verification(email: str, reply: bytes, catch_all: bool) -> EmailVerification:
+    """Interpret the server's reply to RCPT TO for one address"""
+    code = reply[:3].decode(errors='replace')
+    message = reply.decode(errors='replace').strip()
+
+    if code == '250':
+        if catch_all:
+            return EmailVerification(email, VerificationResult.CATCH_ALL, "Domain accepts all emails")
+        return EmailVerification(email, VerificationResult.VALID, "Email exists")
+    elif code in ('550', '551', '552', '553', '554'):
+        return EmailVerification(email, VerificationResult.INVALID, message)
+    elif code == '450' or code == '451':
+        return EmailVerification(email, VerificationResult.UNKNOWN, "Temporary error")
+    else:
+        return EmailVerification(email, VerificationResult.UNKNOWN, message)
 
-    # Fallback to MX-only verification if SMTP is blocked
-    return await verify_email_mx_only(email)
 
+@asynccontextmanager
+async def smtp_sessions() -> AsyncIterator[None]:
+    """
+    Keep SMTP sessions open for reuse until the block exits.
 
-async def _check_smtp(email: str, mx_host: str, timeout: int) -> EmailVerification:
-    """Check email via SMTP connection"""
+    verify_emails_on_domain (and so verify_email_smtp) opens one of these
+    itself, so sessions never outlive a standalone call. Wrap a run of
+    calls in it to share sessions between them; with nested or concurrent
+    blocks, idle sessions are closed when the last one exits.
+    """
+    global _smtp_users
+    _claim_smtp_loop()
+    _smtp_users += 1
     try:
-        # Create connection
-        reader, writer = await asyncio.wait_for(
-            asyncio.open_connection(mx_host, 25),
-            timeout=timeout
-        )
+        yield
+    finally:
+        _smtp_users -= 1
+        if _smtp_users == 0:
+            await close_smtp_connections()
+
+
+def _claim_smtp_loop() -> None:
+    """Forget SMTP state from a previous event loop, which can't be used in this one"""
+    global _smtp_loop, _smtp_users
+    loop = asyncio.get_running_loop()
+    if _smtp_loop is not loop:
+        _smtp_pool.clear()
+        _smtp_locks.clear()
+        _smtp_users = 0
+        _smtp_loop = loop
+
+
+def _get_smtp_lock(domain: str) -> asyncio.Lock:
+    """Get the lock serializing SMTP sessions to a domain in this event loop"""
+    _claim_smtp_loop()
+    lock = _smtp_locks.get(domain)
+    if lock is None:
+        lock = _smtp_locks[domain] = asyncio.Lock()
+    return lock
+
+
+async def _open_smtp(mx_hosts: List[str], timeout: int) -> Optional[_SmtpConnection]:
+    """Connect to the first MX host that greets us and accepts EHLO (or HELO)"""
+    for mx_host in mx_hosts:
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(mx_host, SMTP_PORT),
+                timeout=timeout
+            )
+        except (OSError, asyncio.TimeoutError):
+            continue
 
+        _tune_smtp_socket(writer)
+        conn = _SmtpConnection(reader, writer, pipelining=False)
         try:
-            # Read greeting
-            response = await asyncio.wait_for(reader.readline(), timeout=timeout)
-            if not response.startswith(b'220'):
-                return EmailVerification(email, VerificationResult.UNKNOWN, "Bad greeting")
-
-            # HELO
-            writer.write(b'HELO verify.local\r\n')
-            await writer.drain()
-            response = await asyncio.wait_for(reader.readline(), timeout=timeout)
-
-            # MAIL FROM
-            writer.write(b'MAIL FROM:<verify@verify.local>\r\n')
-            await writer.drain()
-            response = await asyncio.wait_for(reader.readline(), timeout=timeout)
-            if not response.startswith(b'250'):
-                return EmailVerification(email, VerificationResult.UNKNOWN, "MAIL FROM rejected")
-
-            # RCPT TO - This is the key check
-            writer.write(f'RCPT TO:<{email}>\r\n'.encode())
-            await writer.drain()
-            response = await asyncio.wait_for(reader.readline(), timeout=timeout)
-
-            # Analyze response
-            code = response[:3].decode() if len(response) >= 3 else ""
-            message = response.decode().strip()
-
-            if code == '250':
-                # Check for catch-all by testing fake email
-                is_catch_all = await _check_catch_all(reader, writer, email.split('@')[1], timeout)
-                if is_catch_all:
-                    return EmailVerification(email, VerificationResult.CATCH_ALL, "Domain accepts all emails")
-                return EmailVerification(email, VerificationResult.VALID, "Email exists")
-            elif code in ('550', '551', '552', '553', '554'):
-                return EmailVerification(email, VerificationResult.INVALID, message)
-            elif code == '450' or code == '451':
-                return EmailVerification(email, VerificationResult.UNKNOWN, "Temporary error")
-            else:
-                return EmailVerification(email, VerificationResult.UNKNOWN, message)
-
-        finally:
-            writer.write(b'QUIT\r\n')
-            await writer.drain()
-            writer.close()
-            await writer.wait_closed()
-
-    except asyncio.TimeoutError:
-        return EmailVerification(email, VerificationResult.UNKNOWN, "Connection timeout")
-    except Exception as e:
-        return EmailVerification(email, VerificationResult.UNKNOWN, str(e))
-
-
-async def _check_catch_all(reader, writer, domain: str, timeout: int) -> bool:
-    """Check if domain is catch-all by testing fake email"""
+            greeting = await _read_reply(reader, timeout)
+            if greeting[-1].startswith(b'220'):
+                writer.write(b'EHLO verify.local\r\n')
+                await writer.drain()
+                ehlo = await _read_reply(reader, timeout)
+                if ehlo[-1].startswith(b'250'):
+                    conn.pipelining = any(line[4:].strip().upper() == b'PIPELINING' for line in ehlo)
+                    return conn
+
+                writer.write(b'HELO verify.local\r\n')
+                await writer.drain()
+                helo = await _read_reply(reader, timeout)
+                if helo[-1].startswith(b'250'):
+                    return conn
+        except (OSError, asyncio.TimeoutError):
+            pass
+        except ValueError:
+            await _close_smtp(conn)
+            raise
+        await _close_smtp(conn)
+    return None
+
+
+def _tune_smtp_socket(writer: asyncio.StreamWriter) -> None:
+    """
+    Disable Nagle so each command (or pipelined batch) leaves at once, and
+    set a zero linger so closing resets the connection instead of leaving
+    it in TIME_WAIT. We never wait for the server's goodbye anyway.
+    """
+    sock = writer.get_extra_info('socket')
+    if sock is None:
+        return
     try:
-        fake_email = f"nonexistent_user_test_12345@{domain}"
-        writer.write(f'RCPT TO:<{fake_email}>\r\n'.encode())
-        await writer.drain()
-        response = await asyncio.wait_for(reader.readline(), timeout=timeout)
-        code = response[:3].decode() if len(response) >= 3 else ""
-        return code == '250'  # If fake email accepted, it's catch-all
-    except:
-        return False
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+    except OSError:
+        pass
+
+
+async def _probe_recipients(conn: _SmtpConnection, recipients: List[str], timeout: int) -> Optional[List[bytes]]:
+    """
+    Run MAIL FROM, one RCPT TO per recipient, then RSET so the session can
+    be reused. Returns the RCPT replies, or None (closing the session) if
+    the connection failed or the sender was rejected. A garbled reply
+    closes the session and raises ValueError.
+    """
+    commands = [b'MAIL FROM:<verify@verify.local>\r\n']
+    commands += [f'RCPT TO:<{recipient}>\r\n'.encode() for recipient in recipients]
+    commands.append(b'RSET\r\n')
+
+    try:
+        if conn.pipelining:
+            conn.writer.writelines(commands)
+            await conn.writer.drain()
+            replies = [(await _read_reply(conn.reader, timeout))[-1] for _ in commands]
+        else:
+            replies = []
+            for command in commands:
+                conn.writer.write(command)
+                await conn.writer.drain()
+                replies.append((await _read_reply(conn.reader, timeout))[-1])
+    except (OSError, asyncio.TimeoutError):
+        await _close_smtp(conn)
+        return None
+    except ValueError:
+        await _close_smtp(conn)
+        raise
+
+    if not replies[0].startswith(b'250'):
+        await _close_smtp(conn)
+        return None
+    conn.rejections += sum(not reply.startswith(b'2') for reply in replies[1:-1])
+    return replies[1:-1]
+
+
+async def _read_reply(reader: asyncio.StreamReader, timeout: int) -> List[bytes]:
+    """Read one (possibly multi-line) SMTP reply; ValueError if a line is over the stream limit"""
+    lines = []
+    while True:
+        line = await asyncio.wait_for(reader.readline(), timeout=timeout)
+        if not line:
+            raise ConnectionResetError("SMTP server closed the connection")
+        lines.append(line)
+        if line[3:4] != b'-':
+            return lines
+
+
+async def _release_smtp(domain: str, conn: _SmtpConnection) -> None:
+    """Return a session to the pool, closing the oldest idle ones past SMTP_POOL_SIZE"""
+    _smtp_pool[domain] = conn
+    while len(_smtp_pool) > SMTP_POOL_SIZE:
+        oldest = next(iter(_smtp_pool))
+        await _close_smtp(_smtp_pool.pop(oldest))
+
+
+async def _close_smtp(conn: _SmtpConnection) -> None:
+    """Say QUIT and close, without waiting for the server's goodbye"""
+    try:
+        if not conn.writer.is_closing():
+            conn.writer.write(b'QUIT\r\n')
+        conn.writer.close()
+        await asyncio.wait_for(conn.writer.wait_closed(), timeout=1)
+    except (OSError, asyncio.TimeoutError):
+        pass
+
+
+async def close_smtp_connections() -> None:
+    """Close idle pooled SMTP sessions now (smtp_sessions() does this on exit)"""
+    if _smtp_loop is asyncio.get_running_loop():
+        while _smtp_pool:
+            _, conn = _smtp_pool.popitem()
+            await _close_smtp(conn)
+    _smtp_pool.clear()
 
 
 async def verify_emails_batch(emails: list, concurrency: int = 5) -> list:
@@ -175,14 +472,18 @@ async def verify_emails_batch(emails: list, concurrency: int = 5) -> list:
         async with semaphore:
             return await verify_email_smtp(email)
 
-    tasks = [verify_with_limit(email) for email in emails]
-    return await asyncio.gather(*tasks)
+    # Addresses at the same domain share a session, closed once all are done
+    async with smtp_sessions():
+        tasks = [verify_with_limit(email) for email in emails]
+        return await asyncio.gather(*tasks)
+
+
+_EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
 
 
 def quick_syntax_check(email: str) -> bool:
     """Quick syntax validation before SMTP check"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return bool(re.match(pattern, email))
+    return _EMAIL_RE.fullmatch(email) is not None
 
 
 # Test
@@ -192,8 +493,9 @@ if __name__ == "__main__":
             "test@google.com",
             "definitely_not_real_user@google.com",
         ]
-        for email in emails:
-            result = await verify_email_smtp(email)
-            print(f"{email}: {result.result.value} - {result.message}")
+        async with smtp_sessions():
+            for email in emails:
+                result = await verify_email_smtp(email)
+                print(f"{email}: {result.result.value} - {result.message}")
 
     asyncio.run(test())
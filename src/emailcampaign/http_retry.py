@@ -0,0 +1,59 @@
+"""
+HTTP Retry - Back off and retry requests that hit rate limits
+"""
+import asyncio
+import random
+from typing import Awaitable, Callable, Optional
+
+import aiohttp
+
+
+async def request_with_retry(
+    send: Callable[[], Awaitable[aiohttp.ClientResponse]],
+    max_tries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+) -> aiohttp.ClientResponse:
+    """
+    Send a request, retrying while the server answers 429 Too Many Requests.
+
+    Waits for the Retry-After header when the server sends one, otherwise
+    backs off exponentially with decorrelated jitter. After max_tries the
+    last response is returned as-is, so callers still see the 429.
+
+    Args:
+        send: Zero-argument callable that issues the request, e.g. partial(session.get, url)
+        max_tries: Maximum number of attempts
+        base_delay: Initial backoff in seconds
+        max_delay: Upper bound for a single backoff in seconds
+
+    Returns:
+        The response (use it as an async context manager to release it)
+    """
+    delay = base_delay
+    for _ in range(max_tries - 1):
+        response = await send()
+        if response.status != 429:
+            return response
+
+        retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+        response.release()
+
+        if retry_after is not None:
+            wait = min(retry_after, max_delay) + random.uniform(0, 0.5)
+        else:
+            delay = min(max_delay, random.uniform(base_delay, delay * 3))
+            wait = delay
+        await asyncio.sleep(wait)
+
+    return await send()
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds (HTTP dates are ignored)"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None
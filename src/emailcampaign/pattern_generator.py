@@ -2,22 +2,33 @@
 Email Pattern Generator - Creates possible email combinations from name + domain
 """
 import re
-from typing import List
+from functools import lru_cache
+from typing import Iterable, List, Tuple
 from unidecode import unidecode  # Handle accented characters
 
+_CLEAN_RE = re.compile(r'[^a-z\s-]')
 
+# unidecode's transliterations for the Latin blocks (U+0080-U+024F), which
+# cover nearly all accented names, applied in one str.translate pass
+_LATIN_TO_ASCII = str.maketrans({chr(c): unidecode(chr(c)) for c in range(0x80, 0x250)})
+
+
+@lru_cache(maxsize=8192)
 def normalize_name(name: str) -> str:
     """Normalize a name for email generation"""
     if not name:
         return ""
-    # Convert accented characters to ASCII
-    try:
-        name = unidecode(name)
-    except:
-        pass
+    # Convert accented characters to ASCII (unidecode only for non-Latin scripts)
+    if not name.isascii():
+        name = name.translate(_LATIN_TO_ASCII)
+        if not name.isascii():
+            try:
+                name = unidecode(name)
+            except:
+                pass
     # Lowercase and remove special characters
     name = name.lower().strip()
-    name = re.sub(r'[^a-z\s-]', '', name)
+    name = _CLEAN_RE.sub('', name)
     # Handle hyphenated names
     name = name.replace('-', ' ')
     return name.strip()
@@ -28,11 +39,47 @@ def generate_email_patterns(first_name: str, last_name: str, domain: str) -> Lis
     Generate possible email patterns for a person at a company.
     Returns list ordered by likelihood (most common patterns first).
     """
+    return list(_email_patterns(first_name, last_name, domain))
+
+
+def generate_email_patterns_batch(names: Iterable[Tuple[str, str]], domain: str) -> List[List[str]]:
+    """
+    Generate email patterns for several people at the same company.
+
+    Equivalent to calling generate_email_patterns for each name, but the
+    domain suffix is built once and each name's local parts are shared
+    across every domain it appears with.
+
+    Args:
+        names: (first name, last name) for each person
+        domain: Company email domain
+
+    Returns:
+        One pattern list per name, in the same order
+    """
+    if not domain:
+        return [[] for _ in names]
+    at = "@" + domain
+    return [[local + at for local in _local_parts(first, last)] for first, last in names]
+
+
+@lru_cache(maxsize=4096)
+def _email_patterns(first_name: str, last_name: str, domain: str) -> Tuple[str, ...]:
+    """Cached body of generate_email_patterns (a tuple, so callers can't mutate the cache)"""
+    if not domain:
+        return ()
+    at = "@" + domain
+    return tuple(local + at for local in _local_parts(first_name, last_name))
+
+
+@lru_cache(maxsize=8192)
+def _local_parts(first_name: str, last_name: str) -> Tuple[str, ...]:
+    """The 16 local parts (before the @) for a name, independent of the domain"""
     first = normalize_name(first_name)
     last = normalize_name(last_name)
 
-    if not first or not last or not domain:
-        return []
+    if not first or not last:
+        return ()
 
     # Handle multi-part names (take first/last parts)
     first_parts = first.split()
@@ -42,35 +89,30 @@ def generate_email_patterns(first_name: str, last_name: str, domain: str) -> Lis
     l = last_parts[-1] if last_parts else ""   # Last name (surname)
 
     if not f or not l:
-        return []
+        return ()
 
     fi = f[0]  # First initial
     li = l[0]  # Last initial
 
     # Most common email patterns (ordered by frequency in business)
-    patterns = [
-        f"{f}.{l}",           # john.smith
-        f"{f}{l}",            # johnsmith
-        f"{fi}{l}",           # jsmith
-        f"{f}_{l}",           # john_smith
-        f"{f}",               # john
-        f"{l}",               # smith
-        f"{f}{li}",           # johns
-        f"{fi}.{l}",          # j.smith
-        f"{l}.{f}",           # smith.john
-        f"{l}{f}",            # smithjohn
-        f"{l}{fi}",           # smithj
-        f"{fi}{li}",          # js
-        f"{f}-{l}",           # john-smith
-        f"{l}-{f}",           # smith-john
-        f"{fi}_{l}",          # j_smith
-        f"{f}.{li}",          # john.s
-    ]
-
-    # Generate full email addresses
-    emails = [f"{pattern}@{domain}" for pattern in patterns]
-
-    return emails
+    return (
+        f"{f}.{l}",       # john.smith
+        f"{f}{l}",        # johnsmith
+        f"{fi}{l}",       # jsmith
+        f"{f}_{l}",       # john_smith
+        f,                # john
+        l,                # smith
+        f"{f}{li}",       # johns
+        f"{fi}.{l}",      # j.smith
+        f"{l}.{f}",       # smith.john
+        f"{l}{f}",        # smithjohn
+        f"{l}{fi}",       # smithj
+        f"{fi}{li}",      # js
+        f"{f}-{l}",       # john-smith
+        f"{l}-{f}",       # smith-john
+        f"{fi}_{l}",      # j_smith
+        f"{f}.{li}",      # john.s
+    )
 
 
 def generate_email_patterns_extended(first_name: str, last_name: str, domain: str) -> List[str]:
@@ -0,0 +1,223 @@
+"""Tests for Brevo client"""
+import pytest
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from sib_api_v3_sdk.rest import ApiException
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from emailcampaign import brevo_client
+from emailcampaign.brevo_client import (
+    BULK_IMPORT_THRESHOLD,
+    BrevoClient,
+    Contact,
+    ContactBatch,
+    SyncResult,
+    sync_linkedin_to_brevo,
+)
+
+
+def make_contacts(n):
+    return [Contact(email=f"user{i}@acme.com", first_name="User", last_name=str(i)) for i in range(n)]
+
+
+@pytest.fixture
+def client():
+    client = BrevoClient(api_key="test-key")
+    client.contacts_api = MagicMock()
+    client.get_or_create_list = MagicMock(return_value=7)
+    return client
+
+
+class TestGetOrCreateList:
+    @pytest.fixture
+    def client(self):
+        client = BrevoClient(api_key="test-key")
+        client.contacts_api = MagicMock()
+        return client
+
+    def test_finds_list_on_later_page_and_caches_it(self, client):
+        first = [{"id": i, "name": f"List {i}"} for i in range(50)]
+        second = [{"id": 99, "name": "Campaign"}]
+        client.contacts_api.get_lists.side_effect = [MagicMock(lists=first), MagicMock(lists=second)]
+
+        assert client.get_or_create_list("Campaign") == 99
+        assert client.get_or_create_list("Campaign") == 99
+        assert [c.kwargs["offset"] for c in client.contacts_api.get_lists.call_args_list] == [0, 50]
+        client.contacts_api.create_list.assert_not_called()
+
+    def test_creates_missing_list(self, client):
+        client.contacts_api.get_lists.return_value = MagicMock(lists=None)
+        client.contacts_api.create_list.return_value = MagicMock(id=12)
+
+        assert client.get_or_create_list("Campaign") == 12
+        assert client.get_or_create_list("Campaign") == 12
+        assert client.contacts_api.create_list.call_count == 1
+
+
+class TestCreateContact:
+    @pytest.fixture
+    def client(self):
+        client = BrevoClient(api_key="test-key")
+        client.contacts_api = MagicMock()
+        return client
+
+    def test_existing_contact_is_updated(self, client):
+        error = ApiException(status=400, reason="Bad Request")
+        error.body = '{"message": "Contact already exist"}'
+        client.contacts_api.create_contact.side_effect = error
+
+        assert client.create_contact(make_contacts(1)[0], list_ids=[7])
+
+        email, update = client.contacts_api.update_contact.call_args[0]
+        assert email == "user0@acme.com"
+        assert update.list_ids == [7]
+
+    def test_other_errors_are_raised(self, client):
+        client.contacts_api.create_contact.side_effect = ApiException(status=401, reason="Unauthorized")
+
+        with pytest.raises(ApiException) as excinfo:
+            client.create_contact(make_contacts(1)[0])
+        assert excinfo.value.status == 401
+
+
+class TestSyncContacts:
+    def test_large_sync_uses_bulk_import(self, client):
+        client.contacts_api.import_contacts.return_value = MagicMock(process_id=1)
+        result = client.sync_contacts(make_contacts(2500), batch_size=1000)
+
+        assert client.contacts_api.import_contacts.call_count == 3
+        assert client.contacts_api.create_contact.call_count == 0
+        assert result.total == 2500
+        assert result.created == 2500
+        assert result.failed == 0
+
+    def test_import_rows_carry_attributes_and_list(self, client):
+        client.contacts_api.import_contacts.return_value = MagicMock(process_id=1)
+        contacts = make_contacts(BULK_IMPORT_THRESHOLD)
+        contacts[0].company = "Acme"
+        client.sync_contacts(contacts)
+
+        request = client.contacts_api.import_contacts.call_args[0][0]
+        assert request.list_ids == [7]
+        assert request.update_existing_contacts is True
+        assert request.json_body[0] == {
+            "email": "user0@acme.com",
+            "attributes": {"FIRSTNAME": "User", "LASTNAME": "0", "COMPANY": "Acme"},
+        }
+
+    def test_small_sync_uses_per_contact_path(self, client):
+        client.async_sync_contacts = AsyncMock(return_value=SyncResult(3, 3, 0, 0, []))
+        result = client.sync_contacts(make_contacts(3))
+
+        assert client.contacts_api.import_contacts.call_count == 0
+        client.async_sync_contacts.assert_awaited_once()
+        assert result.created == 3
+
+
+class TestAsyncSyncContacts:
+    async def test_creates_updates_and_reports_failures(self, client, monkeypatch):
+        puts = []
+
+        async def create(request):
+            body = await request.json()
+            assert request.headers["api-key"] == "test-key"
+            assert body["listIds"] == [7]
+            if body["email"].startswith("user0"):
+                return web.json_response({"message": "Contact already exist"}, status=400)
+            if body["email"].startswith("user1"):
+                return web.json_response({"message": "Invalid email"}, status=400)
+            return web.json_response({"id": 1}, status=201)
+
+        async def update(request):
+            puts.append(request.match_info["email"])
+            return web.Response(status=204)
+
+        app = web.Application()
+        app.router.add_post("/v3/contacts", create)
+        app.router.add_put("/v3/contacts/{email}", update)
+
+        async with TestServer(app) as server:
+            monkeypatch.setattr(brevo_client, "BREVO_API_URL", str(server.make_url("/v3")))
+            result = await client.async_sync_contacts(make_contacts(4), list_id=7)
+
+        assert puts == ["user0@acme.com"]
+        assert (result.created, result.updated, result.failed) == (2, 1, 1)
+        assert result.errors[0].startswith("user1@acme.com: 400")
+
+
+class TestContactBatch:
+    def test_to_brevo_rows_skips_empty_attributes(self):
+        batch = ContactBatch(
+            emails=["a@acme.com", "b@acme.com"],
+            first_names=["Ann", "Bob"],
+            last_names=["Lee", ""],
+            companies=["Acme", ""],
+            positions=["", "CTO"],
+            linkedin_urls=["", ""],
+        )
+        assert batch.to_brevo_rows() == [
+            {"email": "a@acme.com", "attributes": {"FIRSTNAME": "Ann", "LASTNAME": "Lee", "COMPANY": "Acme"}},
+            {"email": "b@acme.com", "attributes": {"FIRSTNAME": "Bob", "POSITION": "CTO"}},
+        ]
+        assert batch.to_contacts()[1] == Contact("b@acme.com", "Bob", "", "", "CTO", "")
+
+    def test_large_batch_is_imported_from_columns(self, client):
+        client.contacts_api.import_contacts.return_value = MagicMock(process_id=1)
+        n = BULK_IMPORT_THRESHOLD
+        batch = ContactBatch([f"u{i}@acme.com" for i in range(n)], ["U"] * n, ["X"] * n, [""] * n, [""] * n, [""] * n)
+
+        result = client.sync_contact_batch(batch)
+
+        assert result.created == n
+        request = client.contacts_api.import_contacts.call_args[0][0]
+        assert request.json_body[0] == {"email": "u0@acme.com", "attributes": {"FIRSTNAME": "U", "LASTNAME": "X"}}
+
+
+class TestSyncLinkedinToBrevo:
+    def test_missing_found_email_column(self, tmp_path, monkeypatch):
+        csv_path = tmp_path / "connections.csv"
+        csv_path.write_text("First Name,Last Name,URL,Company,Position\nJohn,Smith,,Acme,CTO\n")
+        sync = MagicMock()
+        monkeypatch.setattr(BrevoClient, "sync_contact_batch", sync)
+
+        with pytest.raises(ValueError, match="Found Email"):
+            sync_linkedin_to_brevo(str(csv_path), api_key="test-key")
+
+        sync.assert_not_called()
+
+    @pytest.mark.parametrize("chunksize", [1, 2, 5000])
+    def test_converts_rows_with_emails(self, tmp_path, monkeypatch, chunksize):
+        csv_path = tmp_path / "contacts.csv"
+        csv_path.write_text(
+            "First Name,Last Name,URL,Company,Position,Found Email\n"
+            " John ,Smith,https://li/j,Acme,CTO,john.smith@acme.com\n"
+            "Jane,Doe,,,,\n"
+            "Bob,,,Foo,,bob@foo.com\n"
+        )
+        synced = []
+
+        def fake_sync(self, batch, list_name):
+            synced.extend(batch.to_contacts())
+            return SyncResult(len(batch), len(batch), 0, 0, [])
+
+        monkeypatch.setattr(BrevoClient, "sync_contact_batch", fake_sync)
+
+        result = sync_linkedin_to_brevo(str(csv_path), api_key="test-key", chunksize=chunksize)
+
+        assert result.total == result.created == 2
+        assert [c.email for c in synced] == ["john.smith@acme.com", "bob@foo.com"]
+        assert synced[0] == Contact(
+            email="john.smith@acme.com",
+            first_name="John",
+            last_name="Smith",
+            company="Acme",
+            position="CTO",
+            linkedin_url="https://li/j",
+        )
+        assert synced[1].last_name == ""
@@ -0,0 +1,148 @@
+"""Tests for the command line pipeline"""
+import asyncio
+import pytest
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from emailcampaign import brevo_client, cli
+from emailcampaign.brevo_client import SyncResult
+from emailcampaign.cli import SyncError, _run_pipeline
+
+
+class FakeFinder:
+    """Yields one found contact per email, with a pause so the consumer can run in between"""
+
+    def __init__(self, emails, fail_after=None):
+        self.emails = emails
+        self.fail_after = fail_after
+        self.events = []
+
+    async def iter_csv(self, input_path, output_path):
+        for i, email in enumerate(self.emails):
+            if i == self.fail_after:
+                raise ValueError("Missing required column: Company")
+            await asyncio.sleep(0.01)
+            self.events.append(f"found {i}")
+            row = {"Position": " Engineer ", "URL": f"https://linkedin.com/in/{i}"}
+            yield row, SimpleNamespace(found_email=email, first_name="User", last_name=str(i), company="Acme")
+
+
+class FakeClient:
+    def __init__(self, finder, fail=False):
+        self.finder = finder
+        self.fail = fail
+        self.batches = []
+
+    def sync_contacts(self, contacts, list_name):
+        self.finder.events.append(f"sync {len(contacts)}")
+        if self.fail:
+            raise RuntimeError("401 Unauthorized")
+        self.batches.append(contacts)
+        return SyncResult(total=len(contacts), created=len(contacts), updated=0, failed=0, errors=[])
+
+
+class TestUseUvloop:
+    @pytest.fixture
+    def policies(self, monkeypatch):
+        policies = []
+        monkeypatch.setattr(asyncio, "set_event_loop_policy", policies.append)
+        return policies
+
+    def test_keeps_default_loop_when_uvloop_is_missing(self, monkeypatch, policies):
+        monkeypatch.setitem(sys.modules, "uvloop", None)  # Makes "import uvloop" raise ImportError
+
+        cli._use_uvloop()
+
+        assert policies == []
+
+    def test_installs_uvloop_policy_when_available(self, monkeypatch, policies):
+        class EventLoopPolicy:
+            pass
+
+        monkeypatch.setitem(sys.modules, "uvloop", SimpleNamespace(EventLoopPolicy=EventLoopPolicy))
+
+        cli._use_uvloop()
+
+        assert len(policies) == 1
+        assert isinstance(policies[0], EventLoopPolicy)
+
+
+class TestRunPipeline:
+    async def test_syncs_while_emails_are_still_being_found(self):
+        finder = FakeFinder([f"user{i}@acme.com" for i in range(6)])
+        client = FakeClient(finder)
+
+        await _run_pipeline(finder, client, "in.csv", "out.csv", "List", batch_size=2)
+
+        assert finder.events.index("sync 2") < finder.events.index("found 5")
+
+    async def test_uploads_found_contacts_in_batches(self):
+        finder = FakeFinder(["a@acme.com", None, "b@acme.com", "c@acme.com", "", "d@acme.com", "e@acme.com"])
+        client = FakeClient(finder)
+
+        result = await _run_pipeline(finder, client, "in.csv", "out.csv", "List", batch_size=2)
+
+        assert [len(batch) for batch in client.batches] == [2, 2, 1]
+        assert [c.email for batch in client.batches for c in batch] == [
+            "a@acme.com", "b@acme.com", "c@acme.com", "d@acme.com", "e@acme.com"
+        ]
+        first = client.batches[0][0]
+        assert (first.position, first.linkedin_url, first.company) == ("Engineer", "https://linkedin.com/in/0", "Acme")
+        assert (result.total, result.created) == (5, 5)
+
+    async def test_sync_failure_lets_finding_finish(self):
+        finder = FakeFinder([f"user{i}@acme.com" for i in range(5)])
+        client = FakeClient(finder, fail=True)
+
+        with pytest.raises(SyncError, match="401 Unauthorized"):
+            await _run_pipeline(finder, client, "in.csv", "out.csv", "List", batch_size=2)
+
+        assert "found 4" in finder.events
+        assert [e for e in finder.events if e.startswith("sync")] == ["sync 2"]  # No uploads after a failure
+
+    async def test_finder_failure_is_not_a_sync_error(self):
+        finder = FakeFinder([f"user{i}@acme.com" for i in range(5)], fail_after=3)
+        client = FakeClient(finder)
+
+        with pytest.raises(ValueError, match="Missing required column") as info:
+            await _run_pipeline(finder, client, "in.csv", "out.csv", "List", batch_size=2)
+
+        assert not isinstance(info.value, SyncError)
+        assert [len(batch) for batch in client.batches] == [2, 1]  # Contacts found before the error still sync
+
+
+class TestPipelineCommand:
+    @pytest.fixture
+    def run(self, monkeypatch):
+        monkeypatch.setattr(cli, "_load_domain_cache", lambda: None)
+
+        def run(client_factory, input_path):
+            monkeypatch.setattr(brevo_client, "BrevoClient", client_factory)
+            monkeypatch.setattr(sys, "argv", ["emailcampaign", "pipeline", str(input_path)])
+            cli.main()
+
+        return run
+
+    def test_missing_input_is_reported_as_a_finder_error(self, run, tmp_path, capsys):
+        with pytest.raises(SystemExit):
+            run(lambda: object(), tmp_path / "missing.csv")
+
+        out = capsys.readouterr().out
+        assert "Email finding failed" in out
+        assert "Brevo sync failed" not in out
+        assert "BREVO_API_KEY" not in out
+
+    def test_missing_api_key_still_reports_a_finder_error(self, run, tmp_path, capsys):
+        def no_key():
+            raise ValueError("Brevo API key required")
+
+        with pytest.raises(SystemExit):
+            run(no_key, tmp_path / "missing.csv")
+
+        out = capsys.readouterr().out
+        assert "Email finding failed" in out
+        assert "BREVO_API_KEY" not in out
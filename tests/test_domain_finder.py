@@ -0,0 +1,533 @@
+"""Tests for domain finder"""
+import aiohttp
+import asyncio
+import dns.asyncresolver
+import dns.message
+import dns.resolver
+import dns.rrset
+import pytest
+import sys
+import time
+from pathlib import Path
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from emailcampaign import domain_finder
+from emailcampaign.domain_finder import guess_domain_from_name, normalize_company_name
+
+
+class FakeContent:
+    def __init__(self, body, chunk_size):
+        self.body = body
+        self.chunk_size = chunk_size
+        self.bytes_read = 0
+
+    @property
+    def total_bytes(self):
+        return self.bytes_read
+
+    async def readany(self):
+        chunk = self.body[self.bytes_read:self.bytes_read + self.chunk_size]
+        self.bytes_read += len(chunk)
+        return chunk
+
+    async def iter_chunked(self, n):
+        while chunk := await self.readany():
+            yield chunk
+
+
+class FakeResponse:
+    def __init__(self, body, status=200, chunk_size=7):
+        self.content = FakeContent(body, chunk_size)
+        self.status = status
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    def __init__(self, body, status=200, chunk_size=7):
+        self.response = FakeResponse(body, status, chunk_size)
+        self.urls = []
+
+    async def get(self, url, **kwargs):
+        self.urls.append(url)
+        return self.response
+
+
+SEARCH_HTML = (
+    b'<a href="https://duckduckgo.com/about">About</a>'
+    b'<a href="https://en.wikipedia.org/wiki/Acme">Acme - Wikipedia</a>'
+    b'<a href="https://www.linkedin.com/company/acme">Acme | LinkedIn</a>'
+    b'<a href="https://www.AcmeRockets.com/about?x=1">Acme Rockets</a>'
+    b'<a href="https://acme-other.com/">Other</a>'
+)
+
+
+class TestNormalizeCompanyName:
+    def test_strips_suffix(self):
+        assert normalize_company_name("Acme Corp") == "acme"
+
+    def test_strips_suffix_with_period(self):
+        assert normalize_company_name("Acme Co.") == "acme"
+
+    def test_strips_stacked_suffixes(self):
+        assert normalize_company_name("Acme Holdings Inc") == "acme"
+
+    def test_strips_after_comma(self):
+        assert normalize_company_name("Meta Platforms, Inc.") == "meta platforms"
+
+    def test_keeps_bare_suffix_word(self):
+        assert normalize_company_name("Global") == "global"
+
+
+class TestGuessDomainFromName:
+    def test_known_domain(self):
+        assert guess_domain_from_name("Google LLC") == "google.com"
+
+    def test_known_domain_as_word(self):
+        assert guess_domain_from_name("Cisco Systems") == "cisco.com"
+
+    def test_known_domain_next_to_punctuation(self):
+        assert guess_domain_from_name("Stripe/Payments") == "stripe.com"
+
+    def test_multi_word_known_key(self, monkeypatch):
+        monkeypatch.setitem(domain_finder._KNOWN_BY_WORDS, "bank of america", "bofa.com")
+        monkeypatch.setattr(domain_finder, "_KNOWN_MAX_WORDS", 3)
+        assert guess_domain_from_name("The Bank of America Corporation") == "bofa.com"
+
+    def test_known_key_inside_word_not_matched(self):
+        assert guess_domain_from_name("Intelligent Solutions") == "intelligent.com"
+
+    def test_simple_transformation(self):
+        assert guess_domain_from_name("Big Data Technologies Ltd") == "bigdata.com"
+
+    def test_no_alphanumerics(self):
+        assert guess_domain_from_name("!!!") is None
+
+
+class TestSearchDomainDuckDuckGo:
+    async def test_returns_first_matching_result_domain(self):
+        session = FakeSession(SEARCH_HTML)
+        domain = await domain_finder.search_domain_duckduckgo("Acme Rockets Inc", session)
+        assert domain == "acmerockets.com"
+        assert session.urls[0].startswith("https://html.duckduckgo.com/html/?q=Acme+Rockets+Inc")
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 7, 64, 10_000])
+    async def test_hosts_split_across_chunks(self, chunk_size):
+        session = FakeSession(SEARCH_HTML, chunk_size=chunk_size)
+        assert await domain_finder.search_domain_duckduckgo("Acme Rockets", session) == "acmerockets.com"
+
+    async def test_last_link_at_end_of_body(self):
+        session = FakeSession(b'<a href="https://acmerockets.com', chunk_size=5)
+        assert await domain_finder.search_domain_duckduckgo("Acme Rockets", session) == "acmerockets.com"
+
+    async def test_drains_rest_of_page_after_match(self):
+        session = FakeSession(SEARCH_HTML + b" " * 20_000, chunk_size=1024)
+        assert await domain_finder.search_domain_duckduckgo("Acme Rockets", session) == "acmerockets.com"
+        assert session.response.content.bytes_read == len(SEARCH_HTML) + 20_000
+
+    async def test_drain_stops_at_byte_cap(self):
+        session = FakeSession(SEARCH_HTML + b" " * 200_000, chunk_size=1024)
+        assert await domain_finder.search_domain_duckduckgo("Acme Rockets", session) == "acmerockets.com"
+        assert session.response.content.bytes_read == domain_finder.MAX_SEARCH_BYTES
+
+    async def test_stops_reading_at_byte_cap(self):
+        session = FakeSession(b" " * 200_000 + SEARCH_HTML, chunk_size=8192)
+        assert await domain_finder.search_domain_duckduckgo("Acme Rockets", session) is None
+        assert session.response.content.bytes_read < 80_000
+
+    async def test_connection_is_reused_after_early_match(self):
+        body = b'<a href="https://acmerockets.com/">Acme Rockets</a>' + b" " * 60_000
+        client_ports = []
+
+        async def page(request):
+            client_ports.append(request.transport.get_extra_info("peername")[1])
+            response = web.StreamResponse()
+            await response.prepare(request)
+            for start in range(0, len(body), 4096):  # Still arriving when the match is found
+                await response.write(body[start:start + 4096])
+                await asyncio.sleep(0.001)
+            await response.write_eof()
+            return response
+
+        app = web.Application()
+        app.router.add_get("/html/", page)
+        async with TestServer(app) as server, aiohttp.ClientSession() as session:
+            get = session.get
+            session.get = lambda url, **kwargs: get(server.make_url("/html/"), **kwargs)
+            for _ in range(2):
+                assert await domain_finder.search_domain_duckduckgo("Acme Rockets", session) == "acmerockets.com"
+
+        assert len(client_ports) == 2
+        assert client_ports[0] == client_ports[1]
+
+    async def test_no_matching_result(self):
+        assert await domain_finder.search_domain_duckduckgo("Globex", FakeSession(SEARCH_HTML)) is None
+
+    async def test_no_usable_words_skips_request(self):
+        session = FakeSession(SEARCH_HTML)
+        assert await domain_finder.search_domain_duckduckgo("AB Inc", session) is None
+        assert session.urls == []
+
+    async def test_error_status(self):
+        assert await domain_finder.search_domain_duckduckgo("Acme", FakeSession(SEARCH_HTML, status=503)) is None
+
+
+class FakeResolver:
+    def __init__(self, records):
+        self.records = records
+        self.queries = []
+
+    async def resolve(self, domain, rdtype):
+        self.queries.append((domain, rdtype))
+        if (domain, rdtype) not in self.records:
+            raise dns.resolver.NoAnswer()
+        return self.records[(domain, rdtype)]
+
+
+class TestResolveDomain:
+    async def test_mx_record(self, monkeypatch):
+        resolver = FakeResolver({("acme.com", "MX"): ["mx.acme.com"]})
+        monkeypatch.setattr(domain_finder, "_resolver", resolver)
+        assert await domain_finder._resolve_domain("acme.com")
+        assert resolver.queries == [("acme.com", "MX")]
+
+    async def test_falls_back_to_a_record(self, monkeypatch):
+        resolver = FakeResolver({("acme.com", "A"): ["1.2.3.4"]})
+        monkeypatch.setattr(domain_finder, "_resolver", resolver)
+        assert await domain_finder._resolve_domain("acme.com")
+        assert resolver.queries == [("acme.com", "MX"), ("acme.com", "A")]
+
+    async def test_unresolvable(self, monkeypatch):
+        monkeypatch.setattr(domain_finder, "_resolver", FakeResolver({}))
+        assert not await domain_finder._resolve_domain("nope.com")
+
+    async def test_cancellation_is_not_swallowed(self, monkeypatch):
+        class CancelledResolver:
+            async def resolve(self, domain, rdtype):
+                raise asyncio.CancelledError()
+
+        monkeypatch.setattr(domain_finder, "_resolver", CancelledResolver())
+        with pytest.raises(asyncio.CancelledError):
+            await domain_finder._resolve_domain("acme.com")
+
+
+class SlowDnsServer(asyncio.DatagramProtocol):
+    """Answers every MX query with one record after a delay, without blocking the loop"""
+
+    delay = 0.1
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        asyncio.get_running_loop().call_later(self.delay, self.reply, data, addr)
+
+    def reply(self, data, addr):
+        query = dns.message.from_wire(data)
+        response = dns.message.make_response(query)
+        name = query.question[0].name
+        response.answer.append(dns.rrset.from_text(name, 60, "IN", "MX", f"10 mail.{name}"))
+        self.transport.sendto(response.to_wire(), addr)
+
+
+class TestAsyncResolver:
+    async def test_lookups_run_concurrently_without_blocking_the_loop(self, monkeypatch):
+        transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            SlowDnsServer, local_addr=("127.0.0.1", 0)
+        )
+        resolver = dns.asyncresolver.Resolver(configure=False)
+        resolver.nameservers = ["127.0.0.1"]
+        resolver.port = transport.get_extra_info("sockname")[1]
+        monkeypatch.setattr(domain_finder, "_resolver", resolver)
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        start = time.monotonic()
+        try:
+            found = await asyncio.gather(*[domain_finder._resolve_domain(f"acme{i}.com") for i in range(5)])
+        finally:
+            ticker.cancel()
+            transport.close()
+
+        assert found == [True] * 5
+        assert time.monotonic() - start < 5 * SlowDnsServer.delay  # The five queries overlapped
+        assert ticks >= 5  # Other tasks kept running while the replies were pending
+
+
+@pytest.fixture
+def fake_dns(monkeypatch):
+    """Replace DNS resolution with a lookup table and record queried domains"""
+    lookups = []
+    resolvable = {"acme.com"}
+
+    async def resolve(domain):
+        lookups.append(domain)
+        return domain in resolvable
+
+    monkeypatch.setattr(domain_finder, "_resolve_domain", resolve)
+    monkeypatch.setattr(domain_finder, "_domain_exists_cache", {})
+    return lookups
+
+
+class TestVerifyDomainExists:
+    async def test_positive_result_is_cached(self, fake_dns):
+        assert await domain_finder.verify_domain_exists("acme.com", None)
+        assert await domain_finder.verify_domain_exists("acme.com", None)
+        assert fake_dns == ["acme.com"]
+
+    async def test_negative_result_is_cached_until_ttl(self, fake_dns, monkeypatch):
+        assert not await domain_finder.verify_domain_exists("nope.com", None)
+        assert not await domain_finder.verify_domain_exists("nope.com", None)
+        assert fake_dns == ["nope.com"]
+
+        monkeypatch.setattr(domain_finder, "NEGATIVE_CACHE_TTL", 0)
+        assert not await domain_finder.verify_domain_exists("nope.com", None)
+        assert fake_dns == ["nope.com", "nope.com"]
+
+
+class TestFindDomains:
+    async def test_looks_up_each_company_once_and_keeps_order(self, monkeypatch):
+        calls = []
+
+        async def fake_find_domain(company, session=None, cache=None):
+            calls.append(company)
+            return f"{normalize_company_name(company)}.com"
+
+        monkeypatch.setattr(domain_finder, "find_domain", fake_find_domain)
+        companies = ["Acme Inc", "Globex", "", "Acme", "Globex"]
+
+        domains = await domain_finder.find_domains(companies, session=object())
+
+        assert domains == ["acme.com", "globex.com", None, "acme.com", "globex.com"]
+        assert sorted(calls) == ["Acme Inc", "Globex"]
+
+
+class TestFindDomain:
+    async def test_concurrent_lookups_for_same_company_share_one_request(self, monkeypatch):
+        lookups = []
+
+        async def fake_lookup(company, cache_key, session, cache):
+            lookups.append(company)
+            await asyncio.sleep(0.01)
+            return "acme.com"
+
+        monkeypatch.setattr(domain_finder, "_lookup_domain", fake_lookup)
+
+        domains = await asyncio.gather(
+            domain_finder.find_domain("Acme Inc", session=object()),
+            domain_finder.find_domain("Acme", session=object()),
+            domain_finder.find_domain("ACME Corp", session=object()),
+        )
+
+        assert domains == ["acme.com", "acme.com", "acme.com"]
+        assert lookups == ["Acme Inc"]
+        assert domain_finder._inflight == {}
+
+    async def test_waiter_takes_over_when_the_lookup_is_cancelled(self, monkeypatch):
+        lookups = []
+
+        async def fake_lookup(company, cache_key, session, cache):
+            lookups.append(company)
+            await asyncio.sleep(0.05)
+            return "acme.com"
+
+        monkeypatch.setattr(domain_finder, "_lookup_domain", fake_lookup)
+        owner = asyncio.create_task(domain_finder.find_domain("Acme", session=object()))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(domain_finder.find_domain("Acme Inc", session=object()))
+        await asyncio.sleep(0.01)
+
+        owner.cancel()
+
+        assert await waiter == "acme.com"
+        assert owner.cancelled()
+        assert lookups == ["Acme", "Acme Inc"]
+        assert domain_finder._inflight == {}
+
+    async def test_cancelled_waiter_leaves_the_lookup_running(self, monkeypatch):
+        async def fake_lookup(company, cache_key, session, cache):
+            await asyncio.sleep(0.02)
+            return "acme.com"
+
+        monkeypatch.setattr(domain_finder, "_lookup_domain", fake_lookup)
+        owner = asyncio.create_task(domain_finder.find_domain("Acme", session=object()))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(domain_finder.find_domain("Acme Inc", session=object()))
+        await asyncio.sleep(0.01)
+
+        waiter.cancel()
+
+        assert await owner == "acme.com"
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    async def test_waiter_cancelled_with_the_lookup_does_not_restart_it(self, monkeypatch):
+        lookups = []
+
+        async def fake_lookup(company, cache_key, session, cache):
+            lookups.append(company)
+            await asyncio.sleep(0.02)
+            return "acme.com"
+
+        monkeypatch.setattr(domain_finder, "_lookup_domain", fake_lookup)
+        owner = asyncio.create_task(domain_finder.find_domain("Acme", session=object()))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(domain_finder.find_domain("Acme Inc", session=object()))
+        await asyncio.sleep(0.01)
+
+        owner.cancel()  # Both go together, as when a worker pool is torn down
+        waiter.cancel()
+        results = await asyncio.gather(owner, waiter, return_exceptions=True)
+
+        assert all(isinstance(result, asyncio.CancelledError) for result in results)
+        assert lookups == ["Acme"]
+        assert domain_finder._inflight == {}
+
+
+class TestDomainCache:
+    def test_round_trip(self, tmp_path):
+        path = tmp_path / "cache" / "domains.json"
+        cache = domain_finder.DomainCache(path)
+        cache["acme"] = "acme.com"
+        cache["???"] = None
+        cache.save()
+
+        loaded = domain_finder.DomainCache(path)
+        loaded.load()
+        assert dict(loaded) == {"acme": "acme.com", "???": None}
+        assert list(path.parent.iterdir()) == [path]
+
+    def test_missing_or_corrupt_file_is_empty(self, tmp_path):
+        cache = domain_finder.DomainCache(tmp_path / "missing.json")
+        cache.load()
+        assert len(cache) == 0
+
+        corrupt = tmp_path / "corrupt.json"
+        corrupt.write_text("{not json")
+        cache = domain_finder.DomainCache(corrupt)
+        cache.load()
+        assert len(cache) == 0
+
+    def test_entries_expire(self, tmp_path, monkeypatch):
+        cache = domain_finder.DomainCache(tmp_path / "domains.json", ttl=100, negative_ttl=10)
+        cache["acme"] = "acme.com"
+        cache["???"] = None
+
+        now = domain_finder.time.time()
+        monkeypatch.setattr(domain_finder.time, "time", lambda: now + 50)
+        assert "acme" in cache
+        assert "???" not in cache
+
+        monkeypatch.setattr(domain_finder.time, "time", lambda: now + 150)
+        assert "acme" not in cache
+
+    async def test_only_verified_domains_are_stored(self, tmp_path, monkeypatch):
+        async def exists(domain, session):
+            return domain == "acme.com"
+
+        async def search(company, session):
+            return None  # Offline: the search failed
+
+        monkeypatch.setattr(domain_finder, "verify_domain_exists", exists)
+        monkeypatch.setattr(domain_finder, "search_domain_duckduckgo", search)
+        cache = domain_finder.DomainCache(tmp_path / "domains.json")
+
+        assert await domain_finder.find_domain("Acme", session=object(), cache=cache) == "acme.com"
+        assert await domain_finder.find_domain("Globex", session=object(), cache=cache) == "globex.com"
+        assert await domain_finder.find_domain("???", session=object(), cache=cache) is None
+
+        assert dict(cache) == {"acme": "acme.com", "???": None}
+
+    async def test_find_domain_uses_cache(self, tmp_path):
+        cache = domain_finder.DomainCache(tmp_path / "domains.json")
+        cache["acme"] = "acme-corp.com"
+        assert await domain_finder.find_domain("Acme Inc", session=object(), cache=cache) == "acme-corp.com"
+
+
+class TestGetSession:
+    async def test_one_tuned_session_per_loop(self):
+        session = await domain_finder.get_session()
+        try:
+            assert await domain_finder.get_session() is session
+            assert session.timeout.connect == 5
+            assert session.connector.limit_per_host == 10
+        finally:
+            await domain_finder.close_session()
+        assert session.closed
+
+    async def test_lookups_without_a_session_share_its_connection(self, monkeypatch):
+        client_ports = []
+
+        async def page(request):
+            client_ports.append(request.transport.get_extra_info("peername")[1])
+            company = request.query["q"].split()[0].lower()
+            return web.Response(text=f'<a href="https://{company}.com/">{company}</a>')
+
+        async def exists(domain, session):
+            return True
+
+        monkeypatch.setattr(domain_finder, "guess_domain_from_name", lambda company: None)
+        monkeypatch.setattr(domain_finder, "verify_domain_exists", exists)
+
+        app = web.Application()
+        app.router.add_get("/html/", page)
+        async with TestServer(app) as server:
+            session = await domain_finder.get_session()
+            get = session.get
+            session.get = lambda url, **kwargs: get(server.make_url("/html/" + url[url.index("?"):]), **kwargs)
+            try:
+                assert await domain_finder.find_domain("Acme") == "acme.com"
+                assert await domain_finder.find_domain("Globex") == "globex.com"
+            finally:
+                await domain_finder.close_session()
+
+        assert len(client_ports) == 2
+        assert client_ports[0] == client_ports[1]
+
+
+class TestVerifyDomainExistsCoalescing:
+    async def test_concurrent_checks_share_one_lookup(self, monkeypatch):
+        lookups = []
+
+        async def slow_resolve(domain):
+            lookups.append(domain)
+            await asyncio.sleep(0.01)
+            return True
+
+        monkeypatch.setattr(domain_finder, "_resolve_domain", slow_resolve)
+        monkeypatch.setattr(domain_finder, "_domain_exists_cache", {})
+
+        results = await asyncio.gather(*(domain_finder.verify_domain_exists("acme.com", None) for _ in range(4)))
+
+        assert results == [True] * 4
+        assert lookups == ["acme.com"]
+        assert domain_finder._exists_inflight == {}
+
+    async def test_error_reaches_every_waiter(self, monkeypatch):
+        async def broken(domain):
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(domain_finder, "_resolve_domain", broken)
+        monkeypatch.setattr(domain_finder, "_domain_exists_cache", {})
+
+        results = await asyncio.gather(
+            *(domain_finder.verify_domain_exists("acme.com", None) for _ in range(2)), return_exceptions=True
+        )
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert domain_finder._exists_inflight == {}
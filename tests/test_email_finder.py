@@ -0,0 +1,299 @@
+"""Tests for LinkedIn email finder"""
+import asyncio
+import pandas as pd
+import pytest
+import sys
+import threading
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from emailcampaign import email_finder
+from emailcampaign.email_finder import ContactResult, LinkedInEmailFinder, ResultJournal, read_linkedin_csv
+from emailcampaign.email_verifier import EmailVerification, VerificationResult
+
+LINKEDIN_CSV = (
+    "Notes:\n"
+    "Some preamble\n"
+    "\n"
+    "First Name,Last Name,URL,Company,Position\n"
+    "John,Smith,https://li/j,Acme,CTO\n"
+    "Jane,,https://li/d,Globex,CEO\n"
+    " Bob ,Lee,,Initech,\n"
+)
+
+
+@pytest.fixture
+def fake_domains(monkeypatch):
+    """Resolve every company to <company>.com and record the lookups"""
+    class Lookups(list):
+        concurrency = None
+
+    lookups = Lookups()
+
+    async def fake_find_domains(companies, session=None, cache=None, concurrency=20):
+        lookups.append(list(companies))
+        lookups.concurrency = concurrency
+        return [f"{c}.com".lower() for c in companies]
+
+    monkeypatch.setattr(email_finder, "find_domains", fake_find_domains)
+    return lookups
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    """Accept only the addresses in `valid` and record each verification call"""
+    calls = []
+    valid = {"john.smith@acme.com", "bob.lee@initech.com"}
+
+    async def fake_verify(domain, emails, timeout=10):
+        calls.append((domain, list(emails)))
+        await asyncio.sleep(0.01 * (3 - len(calls)))  # Finish out of order
+        return [
+            EmailVerification(e, VerificationResult.VALID if e in valid else VerificationResult.INVALID, "")
+            for e in emails
+        ]
+
+    monkeypatch.setattr(email_finder, "verify_emails_on_domain", fake_verify)
+    return calls
+
+
+@pytest.fixture
+def finder():
+    finder = LinkedInEmailFinder()
+    finder._port25_ok = True
+    return finder
+
+
+class TestContactResult:
+    def test_is_slotted(self):
+        result = ContactResult("John", "Smith", "Acme", "acme.com", "john.smith@acme.com", "verified", 1)
+
+        assert not hasattr(result, "__dict__")
+        with pytest.raises(AttributeError):
+            result.verified = True  # A misspelt field fails instead of adding an attribute
+        assert result == ContactResult("John", "Smith", "Acme", "acme.com", "john.smith@acme.com", "verified", 1)
+
+
+class TestReadLinkedinCsv:
+    def test_skips_preamble_and_strips_column_names(self, tmp_path):
+        path = tmp_path / "connections.csv"
+        path.write_text("\ufeffNotes:\n\"About your data\"\n\n First Name ,Last Name,Company\nJohn,Smith,Acme\n\nJane\n")
+
+        fieldnames, rows = read_linkedin_csv(str(path))
+
+        assert fieldnames == ["First Name", "Last Name", "Company"]
+        assert rows == [
+            {"First Name": "John", "Last Name": "Smith", "Company": "Acme"},
+            {"First Name": "Jane", "Last Name": "", "Company": ""},
+        ]
+
+    def test_missing_required_column(self, tmp_path):
+        path = tmp_path / "connections.csv"
+        path.write_text("\n\n\nFirst Name,Last Name\nJohn,Smith\n")
+        with pytest.raises(ValueError, match="Company"):
+            asyncio.run(LinkedInEmailFinder().process_csv(str(path), str(tmp_path / "out.csv")))
+
+
+class TestProcessCsv:
+    async def test_writes_results_in_input_order(self, finder, fake_domains, smtp, tmp_path):
+        input_path = tmp_path / "connections.csv"
+        input_path.write_text(LINKEDIN_CSV)
+        output_path = tmp_path / "out.csv"
+
+        await finder.process_csv(str(input_path), str(output_path))
+
+        assert fake_domains == [["Acme", "Initech"]]
+        assert fake_domains.concurrency == 20
+        out = pd.read_csv(output_path, keep_default_na=False)
+        assert out["Found Email"].tolist() == ["john.smith@acme.com", "", "bob.lee@initech.com"]
+        assert out["Email Status"].tolist() == ["verified", "missing_data", "verified"]
+        assert out["Domain"].tolist() == ["acme.com", "", "initech.com"]
+        assert out["Position"].tolist() == ["CTO", "CEO", ""]
+
+    async def test_iter_csv_yields_input_rows(self, finder, fake_domains, smtp, tmp_path):
+        input_path = tmp_path / "connections.csv"
+        input_path.write_text(LINKEDIN_CSV)
+
+        pairs = [pair async for pair in finder.iter_csv(str(input_path), str(tmp_path / "out.csv"))]
+
+        assert len(pairs) == 3
+        by_email = {result.found_email: row for row, result in pairs}
+        assert by_email["john.smith@acme.com"]["Position"] == "CTO"
+        assert by_email["john.smith@acme.com"]["URL"] == "https://li/j"
+
+    async def test_colleagues_are_verified_together(self, finder, fake_domains, smtp, tmp_path, monkeypatch):
+        monkeypatch.setattr(email_finder, "CONTACTS_PER_BATCH", 2)
+        input_path = tmp_path / "connections.csv"
+        input_path.write_text(
+            "\n\n\nFirst Name,Last Name,Company\n"
+            "John,Smith,Acme\nAnn,Lee,Acme\nBob,Lee,Initech\nCy,Young,Acme\n"
+        )
+
+        results = {r.first_name: r async for _, r in finder.iter_csv(str(input_path), str(tmp_path / "out.csv"))}
+
+        assert sorted((domain, len(emails)) for domain, emails in smtp) == [
+            ("acme.com", 8), ("acme.com", 16), ("initech.com", 8)
+        ]
+        assert results["John"].found_email == "john.smith@acme.com"
+        assert results["Ann"].verification_status == "not_found"
+        assert results["Ann"].patterns_tried == 8
+        assert finder.stats["verified"] == 2
+        assert finder.stats["no_match"] == 2
+
+    async def test_resumes_from_journal(self, finder, fake_domains, smtp, tmp_path):
+        input_path = tmp_path / "connections.csv"
+        input_path.write_text(LINKEDIN_CSV)
+        output_path = tmp_path / "out.csv"
+        journal = ResultJournal(f"{output_path}.journal.csv", str(input_path))
+        journal.open()
+        journal.append([(0, ContactResult("John", "Smith", "Acme", "acme.com", "john.smith@acme.com", "verified", 1))])
+        journal.close()
+        with open(journal.path, "a") as f:
+            f.write("2,bob")  # Torn line from a crash
+
+        pairs = [pair async for pair in finder.iter_csv(str(input_path), str(output_path))]
+
+        assert fake_domains == [["Initech"]]
+        assert [result.first_name for _, result in pairs] == ["John", "Jane", "Bob"]
+        assert pairs[0][0]["URL"] == "https://li/j"
+        assert pairs[0][1].patterns_tried == 1
+        assert (finder.stats["found"], finder.stats["verified"]) == (2, 2)
+        out = pd.read_csv(output_path, keep_default_na=False)
+        assert out["Found Email"].tolist() == ["john.smith@acme.com", "", "bob.lee@initech.com"]
+        assert out["Email Status"].tolist() == ["verified", "missing_data", "verified"]
+        assert not Path(journal.path).exists()
+
+    async def test_journal_for_a_changed_input_is_ignored(self, finder, fake_domains, smtp, tmp_path):
+        input_path = tmp_path / "connections.csv"
+        input_path.write_text(LINKEDIN_CSV)
+        output_path = tmp_path / "out.csv"
+        journal = ResultJournal(f"{output_path}.journal.csv", str(input_path))
+        journal.open()
+        journal.append([(0, ContactResult("Ann", "Lee", "Acme", "acme.com", "ann.lee@acme.com", "verified", 1))])
+        journal.close()
+        input_path.write_text(LINKEDIN_CSV + "Cy,Young,,Acme,\n")
+
+        results = [result async for _, result in finder.iter_csv(str(input_path), str(output_path))]
+
+        assert fake_domains == [["Acme", "Initech", "Acme"]]
+        assert "ann.lee@acme.com" not in {r.found_email for r in results}
+        assert len(results) == 4
+
+    async def test_journal_is_kept_when_interrupted(self, finder, fake_domains, smtp, tmp_path):
+        input_path = tmp_path / "connections.csv"
+        input_path.write_text(LINKEDIN_CSV)
+        output_path = tmp_path / "out.csv"
+
+        pairs = finder.iter_csv(str(input_path), str(output_path))
+        await pairs.__anext__()
+        await pairs.aclose()
+
+        journal_path = tmp_path / "out.csv.journal.csv"
+        assert journal_path.read_text().startswith(f"# input={input_path} ")
+        journal = pd.read_csv(journal_path, skiprows=1, keep_default_na=False)
+        assert journal.columns.tolist() == ["idx", "found_email", "status", "domain", "patterns_tried"]
+        assert journal["status"].tolist() == ["missing_data"]
+        assert not output_path.exists()
+
+    async def test_no_domain(self, finder, smtp, tmp_path, monkeypatch):
+        async def no_domains(companies, session=None, cache=None, concurrency=20):
+            return [None for _ in companies]
+
+        monkeypatch.setattr(email_finder, "find_domains", no_domains)
+        input_path = tmp_path / "connections.csv"
+        input_path.write_text(LINKEDIN_CSV)
+
+        await finder.process_csv(str(input_path), str(tmp_path / "out.csv"))
+
+        assert smtp == []
+        assert finder.stats["no_domain"] == 2
+
+    async def test_runs_at_most_concurrency_batches(self, fake_domains, tmp_path, monkeypatch):
+        input_path = tmp_path / "connections.csv"
+        input_path.write_text("\n\n\nFirst Name,Last Name,Company\n" + "".join(f"A,B,C{i}\n" for i in range(20)))
+        finder = LinkedInEmailFinder(concurrency=3, verify=False)
+        running = peak = 0
+
+        async def fake_find(domain, contacts):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.001)
+            running -= 1
+            return [ContactResult(*contact, domain, None, "not_found", 0) for contact in contacts]
+
+        monkeypatch.setattr(finder, "find_emails_at_domain", fake_find)
+        stats = await finder.process_csv(str(input_path), str(tmp_path / "out.csv"))
+
+        assert stats["total"] == 20
+        assert peak == 3
+        assert len(pd.read_csv(tmp_path / "out.csv")) == 20
+
+    async def test_csv_files_are_read_and_written_off_the_loop(self, finder, fake_domains, smtp, tmp_path, monkeypatch):
+        input_path = tmp_path / "connections.csv"
+        input_path.write_text(LINKEDIN_CSV)
+        loop_thread = threading.get_ident()
+        file_threads = []
+
+        def tracked(func):
+            def run(*args):
+                file_threads.append(threading.get_ident())
+                return func(*args)
+            return run
+
+        monkeypatch.setattr(email_finder, "read_linkedin_csv", tracked(read_linkedin_csv))
+        monkeypatch.setattr(email_finder, "write_results", tracked(email_finder.write_results))
+
+        await finder.process_csv(str(input_path), str(tmp_path / "out.csv"))
+
+        assert len(file_threads) == 2
+        assert loop_thread not in file_threads
+
+    async def test_lookup_error_is_raised(self, finder, fake_domains, tmp_path, monkeypatch):
+        input_path = tmp_path / "connections.csv"
+        input_path.write_text(LINKEDIN_CSV)
+
+        async def broken(*args):
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(finder, "find_emails_at_domain", broken)
+        with pytest.raises(RuntimeError, match="boom"):
+            await finder.process_csv(str(input_path), str(tmp_path / "out.csv"))
+
+
+class TestFindEmailWithPort25Blocked:
+    @pytest.fixture
+    def finder(self, monkeypatch):
+        async def fake_find_domain(company, session, cache):
+            return "acme.com"
+
+        async def fail_smtp(*args, **kwargs):
+            raise AssertionError("SMTP should not be attempted")
+
+        monkeypatch.setattr(email_finder, "find_domain", fake_find_domain)
+        monkeypatch.setattr(email_finder, "verify_emails_on_domain", fail_smtp)
+        finder = LinkedInEmailFinder()
+        finder._port25_ok = False
+        return finder
+
+    async def test_returns_top_pattern_when_domain_has_mx(self, finder, monkeypatch):
+        async def mx_ok(email):
+            return EmailVerification(email, VerificationResult.VALID, "MX verified")
+
+        monkeypatch.setattr(email_finder, "verify_email_mx_only", mx_ok)
+        result = await finder.find_email_for_contact("John", "Smith", "Acme", session=None)
+
+        assert (result.found_email, result.verification_status) == ("john.smith@acme.com", "mx_only")
+        assert finder.stats["mx_only"] == finder.stats["found"] == 1
+
+    async def test_no_mx(self, finder, monkeypatch):
+        async def no_mx(email):
+            return EmailVerification(email, VerificationResult.INVALID, "No MX records")
+
+        monkeypatch.setattr(email_finder, "verify_email_mx_only", no_mx)
+        result = await finder.find_email_for_contact("John", "Smith", "Acme", session=None)
+
+        assert result.found_email is None
+        assert finder.stats["no_match"] == 1
@@ -0,0 +1,393 @@
+"""Tests for email verifier"""
+import asyncio
+import dns.resolver
+import pytest
+import socket
+import struct
+import sys
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from emailcampaign import email_verifier
+from emailcampaign.email_verifier import VerificationResult, quick_syntax_check, verify_emails_on_domain
+
+
+class MxRecord:
+    def __init__(self, preference, exchange):
+        self.preference = preference
+        self.exchange = exchange
+
+
+class FakeResolver:
+    def __init__(self, records):
+        self.records = records
+        self.queries = []
+
+    async def resolve(self, domain, rdtype):
+        self.queries.append((domain, rdtype))
+        await asyncio.sleep(0.01)
+        if domain not in self.records:
+            raise dns.resolver.NXDOMAIN()
+        return self.records[domain]
+
+
+@pytest.fixture
+def resolver(monkeypatch):
+    resolver = FakeResolver({"acme.com": [MxRecord(20, "mx2.acme.com."), MxRecord(10, "mx1.acme.com.")]})
+    monkeypatch.setattr(email_verifier, "_resolver", resolver)
+    monkeypatch.setattr(email_verifier, "mx_cache", {})
+    return resolver
+
+
+class TestGetMxRecords:
+    async def test_sorted_by_preference_and_cached(self, resolver):
+        assert await email_verifier.get_mx_records("acme.com") == ["mx1.acme.com", "mx2.acme.com"]
+        assert await email_verifier.get_mx_records("acme.com") == ["mx1.acme.com", "mx2.acme.com"]
+        assert resolver.queries == [("acme.com", "MX")]
+
+    async def test_concurrent_lookups_share_one_query(self, resolver):
+        results = await asyncio.gather(*(email_verifier.get_mx_records("acme.com") for _ in range(5)))
+        assert all(hosts == ["mx1.acme.com", "mx2.acme.com"] for hosts in results)
+        assert len(resolver.queries) == 1
+        assert email_verifier._mx_inflight == {}
+
+    async def test_waiter_resolves_again_when_the_first_lookup_is_cancelled(self, resolver):
+        owner = asyncio.create_task(email_verifier.get_mx_records("acme.com"))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(email_verifier.get_mx_records("acme.com"))
+        await asyncio.sleep(0)
+
+        owner.cancel()
+
+        assert await waiter == ["mx1.acme.com", "mx2.acme.com"]
+        assert len(resolver.queries) == 2
+        assert email_verifier._mx_inflight == {}
+
+    async def test_unresolvable_domain_is_cached_until_ttl(self, resolver, monkeypatch):
+        assert await email_verifier.get_mx_records("nope.com") == []
+        assert await email_verifier.get_mx_records("nope.com") == []
+        assert len(resolver.queries) == 1
+
+        monkeypatch.setattr(email_verifier, "MX_NEGATIVE_CACHE_TTL", 0)
+        assert await email_verifier.get_mx_records("nope.com") == []
+        assert len(resolver.queries) == 2
+
+    async def test_positive_entries_expire(self, resolver, monkeypatch):
+        await email_verifier.get_mx_records("acme.com")
+        monkeypatch.setattr(email_verifier, "MX_CACHE_TTL", 0)
+        await email_verifier.get_mx_records("acme.com")
+        assert len(resolver.queries) == 2
+
+    async def test_cache_size_is_bounded(self, resolver, monkeypatch):
+        monkeypatch.setattr(email_verifier, "MX_CACHE_SIZE", 2)
+        for domain in ["a.com", "b.com", "acme.com"]:
+            await email_verifier.get_mx_records(domain)
+        assert list(email_verifier.mx_cache) == ["b.com", "acme.com"]
+
+
+class FakeSmtpServer:
+    """Minimal SMTP server that accepts RCPT TO only for known mailboxes"""
+
+    def __init__(self, mailboxes, pipelining=True, catch_all=False):
+        self.mailboxes = set(mailboxes)
+        self.pipelining = pipelining
+        self.catch_all = catch_all
+        self.greeting = b"220 mx.acme.com ESMTP\r\n"
+        self.rcpt_replies = {}  # Address -> canned reply, overriding the mailbox check
+        self.error_limit = None  # Hang up after this many refused RCPTs on a session, like Postfix
+        self.errors = {}  # Writer -> RCPTs refused on that session
+        self.connections = 0
+        self.reads = []
+        self.writers = []
+        self.server = None
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        self.writers.append(writer)
+        writer.write(self.greeting)
+        while True:
+            try:
+                line = await reader.readline()
+            except ConnectionError:
+                break
+            if not line:
+                break
+            self.reads.append(line)
+            command = line.strip().upper()
+            if command.startswith(b"EHLO"):
+                writer.write(b"250-mx.acme.com\r\n" + b"250-PIPELINING\r\n" * self.pipelining + b"250 8BITMIME\r\n")
+            elif command.startswith(b"RCPT TO:"):
+                if not self.rcpt(writer, line.strip()[9:-1].decode()):
+                    break
+            elif command == b"QUIT":
+                writer.write(b"221 Bye\r\n")
+                break
+            else:
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+        writer.close()
+
+    def rcpt(self, writer, address):
+        """Answer RCPT TO; False once the session has had too many refusals"""
+        reply = self.rcpt_reply(address)
+        if not reply.startswith(b"2"):
+            self.errors[writer] = self.errors.get(writer, 0) + 1
+            if self.error_limit is not None and self.errors[writer] > self.error_limit:
+                writer.write(b"421 Too many errors\r\n")
+                return False
+        writer.write(reply)
+        return True
+
+    def rcpt_reply(self, address):
+        if address in self.rcpt_replies:
+            return self.rcpt_replies[address]
+        if self.catch_all or address in self.mailboxes:
+            return b"250 OK\r\n"
+        return b"550 No such user\r\n"
+
+    async def drop_connections(self):
+        for writer in self.writers:
+            writer.close()
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+async def smtp_server(monkeypatch):
+    server = FakeSmtpServer({"john.smith@acme.com"})
+    server.server = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    monkeypatch.setattr(email_verifier, "SMTP_PORT", server.server.sockets[0].getsockname()[1])
+    monkeypatch.setitem(email_verifier.mx_cache, "acme.com", (["127.0.0.1"], time.monotonic()))
+    monkeypatch.setattr(email_verifier, "_catch_all_cache", {})
+    yield server
+    await email_verifier.close_smtp_connections()
+    server.server.close()
+    await server.server.wait_closed()
+
+
+class TestVerifyEmailsOnDomain:
+    async def test_classifies_each_address_over_one_connection(self, smtp_server):
+        results = await verify_emails_on_domain("acme.com", ["johnsmith@acme.com", "john.smith@acme.com"])
+
+        assert [r.result for r in results] == [VerificationResult.INVALID, VerificationResult.VALID]
+        assert [r.email for r in results] == ["johnsmith@acme.com", "john.smith@acme.com"]
+        assert smtp_server.connections == 1
+        rcpts = [line for line in smtp_server.reads if line.startswith(b"RCPT")]
+        assert len(rcpts) == 3  # Two addresses plus the catch-all probe
+
+    async def test_catch_all_domain(self, smtp_server):
+        smtp_server.catch_all = True
+        results = await verify_emails_on_domain("acme.com", ["a@acme.com", "b@acme.com"])
+        assert {r.result for r in results} == {VerificationResult.CATCH_ALL}
+
+    async def test_session_is_reused_between_calls(self, smtp_server):
+        async with email_verifier.smtp_sessions():
+            await verify_emails_on_domain("acme.com", ["a@acme.com"])
+            results = await verify_emails_on_domain("acme.com", ["john.smith@acme.com"])
+
+        assert results[0].result == VerificationResult.VALID
+        assert smtp_server.connections == 1
+        assert smtp_server.reads.count(b"RSET\r\n") == 2
+
+    async def test_catch_all_is_probed_once_per_domain(self, smtp_server):
+        await verify_emails_on_domain("acme.com", ["a@acme.com"])
+        await verify_emails_on_domain("acme.com", ["b@acme.com"])
+
+        probes = [line for line in smtp_server.reads if b"nonexistent_user" in line]
+        assert len(probes) == 1
+        assert email_verifier._catch_all_cache == {"acme.com": False}
+
+    async def test_concurrent_first_calls_probe_once(self, smtp_server):
+        await asyncio.gather(*(verify_emails_on_domain("acme.com", [f"u{i}@acme.com"]) for i in range(3)))
+
+        probes = [line for line in smtp_server.reads if b"nonexistent_user" in line]
+        assert len(probes) == 1
+
+    async def test_temporary_probe_failure_is_not_cached(self, smtp_server):
+        smtp_server.rcpt_replies["nonexistent_user_test_12345@acme.com"] = b"450 Greylisted, try later\r\n"
+        smtp_server.catch_all = True
+
+        await verify_emails_on_domain("acme.com", ["a@acme.com"])
+        assert "acme.com" not in email_verifier._catch_all_cache
+
+        del smtp_server.rcpt_replies["nonexistent_user_test_12345@acme.com"]
+        results = await verify_emails_on_domain("acme.com", ["b@acme.com"])
+
+        assert results[0].result == VerificationResult.CATCH_ALL
+        assert email_verifier._catch_all_cache == {"acme.com": True}
+
+    async def test_known_catch_all_domain_skips_smtp(self, smtp_server):
+        smtp_server.catch_all = True
+        await verify_emails_on_domain("acme.com", ["a@acme.com"])
+        reads = len(smtp_server.reads)
+
+        results = await verify_emails_on_domain("acme.com", ["b@acme.com"])
+
+        assert results[0].result == VerificationResult.CATCH_ALL
+        assert len(smtp_server.reads) == reads
+
+    async def test_concurrent_calls_share_the_session(self, smtp_server):
+        batches = await asyncio.gather(*(verify_emails_on_domain("acme.com", [f"u{i}@acme.com"]) for i in range(5)))
+
+        assert all(batch[0].result == VerificationResult.INVALID for batch in batches)
+        assert smtp_server.connections == 1
+
+    async def test_reconnects_when_idle_session_was_dropped(self, smtp_server):
+        async with email_verifier.smtp_sessions():
+            await verify_emails_on_domain("acme.com", ["a@acme.com"])
+            await smtp_server.drop_connections()
+
+            results = await verify_emails_on_domain("acme.com", ["john.smith@acme.com"])
+
+        assert results[0].result == VerificationResult.VALID
+        assert smtp_server.connections == 2
+
+    async def test_socket_disables_nagle_and_linger(self, smtp_server):
+        async with email_verifier.smtp_sessions():
+            await verify_emails_on_domain("acme.com", ["a@acme.com"])
+            sock = email_verifier._smtp_pool["acme.com"].writer.get_extra_info("socket")
+            assert sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+            assert struct.unpack("ii", sock.getsockopt(socket.SOL_SOCKET, socket.SO_LINGER, 8)) == (1, 0)
+
+    async def test_without_pipelining_commands_are_sent_one_at_a_time(self, smtp_server):
+        smtp_server.pipelining = False
+        results = await verify_emails_on_domain("acme.com", ["a@acme.com", "john.smith@acme.com"])
+        assert [r.result for r in results] == [VerificationResult.INVALID, VerificationResult.VALID]
+
+    async def test_falls_back_to_mx_only_when_port_is_closed(self, smtp_server, monkeypatch):
+        smtp_server.server.close()
+        await smtp_server.server.wait_closed()
+
+        results = await verify_emails_on_domain("acme.com", ["a@acme.com"], timeout=1)
+
+        assert results[0].result == VerificationResult.VALID
+        assert "MX verified" in results[0].message
+
+    async def test_oversized_reply_is_unknown(self, smtp_server):
+        smtp_server.greeting = b"220 " + b"x" * 70000 + b"\r\n"
+
+        results = await verify_emails_on_domain("acme.com", ["a@acme.com", "john.smith@acme.com"])
+
+        assert {r.result for r in results} == {VerificationResult.UNKNOWN}
+        assert "SMTP error" in results[0].message
+        assert "acme.com" not in email_verifier._smtp_pool
+        assert "acme.com" not in email_verifier._catch_all_cache
+
+    async def test_splits_recipients_across_transactions(self, smtp_server, monkeypatch):
+        monkeypatch.setattr(email_verifier, "MAX_RECIPIENTS", 3)
+        emails = [f"u{i}@acme.com" for i in range(6)] + ["john.smith@acme.com"]
+
+        results = await verify_emails_on_domain("acme.com", emails)
+
+        assert [r.result for r in results] == [VerificationResult.INVALID] * 6 + [VerificationResult.VALID]
+        assert sum(line.startswith(b"MAIL FROM") for line in smtp_server.reads) == 3  # 1 probe + 7 addresses
+        assert smtp_server.connections == 1
+
+    async def test_stays_under_the_servers_error_limit(self, smtp_server):
+        smtp_server.error_limit = 20  # Postfix's smtpd_hard_error_limit default
+        emails = [f"u{i}@acme.com" for i in range(95)] + ["john.smith@acme.com"]  # 12 contacts x 8 patterns
+
+        results = await verify_emails_on_domain("acme.com", emails)
+
+        assert [r.result for r in results] == [VerificationResult.INVALID] * 95 + [VerificationResult.VALID]
+        assert max(smtp_server.errors.values()) <= email_verifier.MAX_SESSION_REJECTIONS
+
+    async def test_session_dropped_partway_is_unknown(self, smtp_server):
+        smtp_server.error_limit = 3  # Stricter than our per-session budget
+        emails = [f"u{i}@acme.com" for i in range(11)] + ["john.smith@acme.com"]
+
+        results = await verify_emails_on_domain("acme.com", emails)
+
+        assert {r.result for r in results} == {VerificationResult.UNKNOWN}  # Not the MX-only "valid"
+        assert "SMTP error" in results[0].message
+        assert "acme.com" not in email_verifier._smtp_pool
+
+    async def test_no_mx_records(self, monkeypatch):
+        monkeypatch.setitem(email_verifier.mx_cache, "nope.com", ([], time.monotonic()))
+        results = await verify_emails_on_domain("nope.com", ["a@nope.com"])
+        assert results[0].result == VerificationResult.UNKNOWN
+
+
+class TestEmailVerification:
+    def test_is_slotted(self):
+        verification = email_verifier.EmailVerification("a@acme.com", VerificationResult.VALID, "")
+
+        assert not hasattr(verification, "__dict__")
+        with pytest.raises(AttributeError):
+            verification.status = VerificationResult.INVALID
+
+
+class TestQuickSyntaxCheck:
+    @pytest.mark.parametrize("email", ["john.smith@acme.com", "j_s+tag%x@mail.acme-rockets.co.uk", "a@b.io"])
+    def test_valid(self, email):
+        assert quick_syntax_check(email)
+
+    @pytest.mark.parametrize(
+        "email",
+        ["", "@acme.com", "john@", "john@acme", "john@acme.c", "john@acme.c0m", "jo hn@acme.com",
+         "josé@acme.com", "john@@acme.com", "john@acme.com\n"],
+    )
+    def test_invalid(self, email):
+        assert not quick_syntax_check(email)
+
+
+class TestProbePort25Available:
+    async def test_open_port(self, smtp_server):
+        assert await email_verifier.probe_port25_available("127.0.0.1")
+
+    async def test_blocked_port(self, smtp_server):
+        smtp_server.server.close()
+        await smtp_server.server.wait_closed()
+        assert not await email_verifier.probe_port25_available("127.0.0.1", timeout=1)
+
+
+class TestSmtpSessions:
+    async def test_sessions_close_when_the_outermost_block_exits(self, smtp_server):
+        async with email_verifier.smtp_sessions():
+            async with email_verifier.smtp_sessions():
+                await verify_emails_on_domain("acme.com", ["a@acme.com"])
+            assert "acme.com" in email_verifier._smtp_pool
+
+        assert email_verifier._smtp_pool == {}
+        assert email_verifier._smtp_users == 0
+
+
+class TestVerifyEmailSmtp:
+    async def test_catch_all_probe_runs_first_and_once(self, smtp_server):
+        assert (await email_verifier.verify_email_smtp("john.smith@acme.com")).result == VerificationResult.VALID
+        assert (await email_verifier.verify_email_smtp("nobody@acme.com")).result == VerificationResult.INVALID
+
+        rcpts = [line for line in smtp_server.reads if line.startswith(b"RCPT")]
+        assert len(rcpts) == 3
+        assert b"nonexistent_user" in rcpts[0]
+
+    async def test_catch_all_domain(self, smtp_server):
+        smtp_server.catch_all = True
+        assert (await email_verifier.verify_email_smtp("a@acme.com")).result == VerificationResult.CATCH_ALL
+
+        result = await email_verifier.verify_email_smtp("john.smith@acme.com")
+
+        assert result.result == VerificationResult.CATCH_ALL
+        assert not any(b"john.smith" in line for line in smtp_server.reads)
+
+    async def test_reuses_the_domain_session(self, smtp_server):
+        async with email_verifier.smtp_sessions():
+            for email in ["a@acme.com", "b@acme.com", "john.smith@acme.com"]:
+                await email_verifier.verify_email_smtp(email)
+        assert smtp_server.connections == 1
+        assert smtp_server.reads.count(b"EHLO verify.local\r\n") == 1
+
+    async def test_standalone_call_closes_its_session(self, smtp_server):
+        await email_verifier.verify_email_smtp("john.smith@acme.com")
+
+        assert email_verifier._smtp_pool == {}
+        assert smtp_server.reads[-1] == b"QUIT\r\n"
+
+    async def test_batch_shares_sessions_and_closes_them(self, smtp_server):
+        results = await email_verifier.verify_emails_batch(["a@acme.com", "b@acme.com", "john.smith@acme.com"])
+
+        assert [r.result for r in results] == [VerificationResult.INVALID] * 2 + [VerificationResult.VALID]
+        assert smtp_server.connections == 1
+        assert email_verifier._smtp_pool == {}
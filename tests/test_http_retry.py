@@ -0,0 +1,68 @@
+"""Tests for HTTP retry helper"""
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from emailcampaign import http_retry
+from emailcampaign.http_retry import request_with_retry
+
+
+class FakeResponse:
+    def __init__(self, status, headers=None):
+        self.status = status
+        self.headers = headers or {}
+        self.released = False
+
+    def release(self):
+        self.released = True
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(http_retry.asyncio, "sleep", fake_sleep)
+    return delays
+
+
+def responder(*responses):
+    queue = list(responses)
+
+    async def send():
+        return queue.pop(0)
+
+    return send
+
+
+class TestRequestWithRetry:
+    async def test_success_is_returned_immediately(self, sleeps):
+        ok = FakeResponse(200)
+        assert await request_with_retry(responder(ok)) is ok
+        assert sleeps == []
+
+    async def test_honors_retry_after(self, sleeps):
+        limited = FakeResponse(429, {"Retry-After": "7"})
+        ok = FakeResponse(200)
+
+        assert await request_with_retry(responder(limited, ok)) is ok
+        assert limited.released
+        assert len(sleeps) == 1
+        assert 7 <= sleeps[0] <= 7.5
+
+    async def test_backs_off_without_retry_after(self, sleeps):
+        responses = [FakeResponse(429) for _ in range(3)] + [FakeResponse(200)]
+        assert (await request_with_retry(responder(*responses), base_delay=1.0)).status == 200
+        assert len(sleeps) == 3
+        assert all(1.0 <= delay <= 60.0 for delay in sleeps)
+
+    async def test_gives_up_after_max_tries(self, sleeps):
+        responses = [FakeResponse(429) for _ in range(3)]
+        last = await request_with_retry(responder(*responses), max_tries=3)
+        assert last is responses[-1]
+        assert len(sleeps) == 2
@@ -6,7 +6,7 @@ from pathlib import Path
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from emailcampaign.pattern_generator import generate_email_patterns, normalize_name
+from emailcampaign.pattern_generator import generate_email_patterns, generate_email_patterns_batch, normalize_name
 
 
 class TestNormalizeName:
@@ -59,3 +59,34 @@ class TestGenerateEmailPatterns:
         assert len(patterns) > 0
         # Should use first part of first name
         assert "mary.smith@acme.com" in patterns
+
+    def test_cached_result_is_not_shared(self):
+        patterns = generate_email_patterns("John", "Smith", "acme.com")
+        patterns.clear()
+        assert generate_email_patterns("John", "Smith", "acme.com")[0] == "john.smith@acme.com"
+
+    def test_full_pattern_list(self):
+        assert generate_email_patterns("John", "Smith", "acme.com") == [
+            "john.smith@acme.com", "johnsmith@acme.com", "jsmith@acme.com", "john_smith@acme.com",
+            "john@acme.com", "smith@acme.com", "johns@acme.com", "j.smith@acme.com",
+            "smith.john@acme.com", "smithjohn@acme.com", "smithj@acme.com", "js@acme.com",
+            "john-smith@acme.com", "smith-john@acme.com", "j_smith@acme.com", "john.s@acme.com",
+        ]
+
+    def test_batch_matches_single_calls(self):
+        names = [("John", "Smith"), ("", "Doe"), ("José", "García-López"), ("John", "Smith")]
+        assert generate_email_patterns_batch(names, "acme.com") == [
+            generate_email_patterns(first, last, "acme.com") for first, last in names
+        ]
+        assert generate_email_patterns_batch(names, "") == [[], [], [], []]
+
+
+class TestNormalizeNameTransliteration:
+    @pytest.mark.parametrize("name", ["José María", "García-López", "Zoë", "Łukasz Żółć", "Ørsted", "Dvořák", "Müller"])
+    def test_latin_names_match_unidecode(self, name):
+        from unidecode import unidecode
+
+        assert normalize_name(name) == normalize_name(unidecode(name))
+
+    def test_non_latin_falls_back_to_unidecode(self):
+        assert normalize_name("Дмитрий") == "dmitrii"